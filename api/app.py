@@ -1,5 +1,6 @@
 
 from flask import Flask
+import click
 from flask_cors import CORS
 from models import db
 import os
@@ -11,11 +12,15 @@ from routes.performance import performance_bp
 from routes.auth import auth_bp
 from routes.time_clock import time_clock_bp
 from routes.announcements import announcements_bp
+from routes.system import system_bp
+from routes.org import org_bp
+from scheduler import init_scheduler, is_serving_process
+from idempotency import init_idempotency
 
 # Load environment variables from .env file
 load_dotenv()
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     
     # Simplified database URI configuration
@@ -26,12 +31,16 @@ def create_app():
     
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Allow scripts such as benchmark.py to point the app at another database
+    if test_config:
+        app.config.update(test_config)
+    
     # Apply CORS globally to all routes - FIXED to prevent duplicate headers
     CORS(app, 
          origins="*", 
          supports_credentials=True,
-         allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Credentials"],
-         expose_headers=["Content-Type", "Authorization"])
+         allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Credentials", "Idempotency-Key"],
+         expose_headers=["Content-Type", "Authorization", "Idempotent-Replayed"])
     
     # Initialize database
     db.init_app(app)
@@ -39,14 +48,15 @@ def create_app():
     # Create all database tables if they don't exist
     with app.app_context():
         db.create_all()
-        
-        # Run the employee status update after the app is fully initialized
-        try:
-            from routes.absence.absence_utils import update_employee_statuses_based_on_absences
-            update_employee_statuses_based_on_absences()
-            print("Employee statuses updated successfully on application start")
-        except Exception as e:
-            print(f"Error updating employee statuses on application start: {str(e)}")
+    
+    # Replay retried POSTs that carry an Idempotency-Key header
+    init_idempotency(app)
+    
+    # The daily status rollover runs in the background scheduler rather than
+    # at startup, so booting a worker never scans the employees table. CLI
+    # commands and the reloader's parent process don't run it.
+    if not app.testing and os.getenv('SCHEDULER_ENABLED', '1') == '1' and is_serving_process(app):
+        init_scheduler(app)
     
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -56,16 +66,50 @@ def create_app():
     app.register_blueprint(absences_combined_bp, url_prefix='/api/absences')
     app.register_blueprint(time_clock_bp, url_prefix='/api/time-clock')
     app.register_blueprint(announcements_bp, url_prefix='/api/announcements')
+    app.register_blueprint(system_bp, url_prefix='/api/system')
+    app.register_blueprint(org_bp, url_prefix='/api/org')
     
     @app.route('/')
     def hello():
         return {'message': 'HR Management API is running!'}
     
+    # Maintenance commands, run with `flask <command>`
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        from routes.employee_search import rebuild_search_index
+        indexed = rebuild_search_index()
+        print(f"Search index rebuilt for {indexed} employees")
+    
+    @app.cli.command('refresh-employee-statuses')
+    def refresh_employee_statuses_command():
+        from routes.absence.absence_utils import update_employee_statuses_based_on_absences
+        update_employee_statuses_based_on_absences()
+    
+    @app.cli.command('rebuild-leave-ledger')
+    def rebuild_leave_ledger_command():
+        from routes.absence.leave_utils import rebuild_leave_ledger
+        posted = rebuild_leave_ledger()
+        print(f"Leave ledger rebuilt from {posted} approved absences")
+    
+    @app.cli.command('rebuild-org-closure')
+    def rebuild_org_closure_command():
+        from routes.org_hierarchy import rebuild_org_closure
+        employees = rebuild_org_closure()
+        print(f"Org hierarchy rebuilt for {employees} employees")
+    
+    @app.cli.command('backfill-time-clock')
+    @click.option('--batch-size', default=1000, show_default=True)
+    def backfill_time_clock_command(batch_size):
+        from routes.time_clock_utils import backfill_clock_timestamps
+        converted, skipped = backfill_clock_timestamps(batch_size)
+        print(f"Time clock timestamps filled for {converted} entries ({skipped} unparseable entries skipped)")
+    
     # Remove the after_request handler that was adding duplicate headers
     # This was causing the CORS error by adding headers that were already added by flask-cors
     
     return app
 
 if __name__ == '__main__':
-    app = create_app()
-    app.run(debug=True, host='0.0.0.0')
+    # Debug is set before create_app so the scheduler starts only in the reloader child
+    app = create_app({'DEBUG': True})
+    app.run(host='0.0.0.0')
@@ -0,0 +1,169 @@
+import datetime
+import hashlib
+import os
+from flask import request, g, jsonify, current_app
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyRecord
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# Bodies above this size (or not JSON, like streamed imports) are not covered
+IDEMPOTENCY_MAX_BODY = 1024 * 1024
+
+def idempotency_ttl():
+    return datetime.timedelta(seconds=int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400')))
+
+def idempotency_lease():
+    """
+    How long a request may hold a key in progress before a retry can take it
+    over. Keep it above the worker timeout so only dead requests lose it.
+    """
+    return datetime.timedelta(seconds=int(os.getenv('IDEMPOTENCY_LEASE', '60')))
+
+def request_client():
+    """
+    Identifies the caller: the credentials they send, or their address
+    """
+    credentials = request.headers.get('Authorization') or f'addr:{request.remote_addr}'
+    return hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+
+def request_fingerprint():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode('utf-8'))
+    digest.update(request.full_path.encode('utf-8'))
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+# Endpoints that read the raw request stream, which fingerprinting would consume
+IDEMPOTENCY_EXEMPT_ENDPOINTS = {'employees.bulk_import_employees'}
+
+def is_covered_request():
+    """
+    Only JSON POSTs with a declared body size are covered: hashing the body
+    reads it whole, so chunked or streamed uploads must be left alone
+    """
+    if request.method != 'POST' or IDEMPOTENCY_HEADER not in request.headers:
+        return False
+    if request.endpoint in IDEMPOTENCY_EXEMPT_ENDPOINTS:
+        return False
+    return (
+        request.is_json
+        and request.content_length is not None
+        and request.content_length <= IDEMPOTENCY_MAX_BODY
+    )
+
+def claim_key(client, key, fingerprint, now):
+    """
+    Inserts the in-progress record for a key. Returns None when this request
+    owns the key, otherwise the existing record.
+    """
+    try:
+        db.session.add(IdempotencyRecord(
+            client=client, key=key, request_hash=fingerprint,
+            created_at=now, expires_at=now + idempotency_ttl()
+        ))
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+        return db.session.get(IdempotencyRecord, (client, key))
+
+def reclaim_abandoned_key(client, key, fingerprint, now):
+    """
+    Takes over an in-progress record whose lease ran out, most likely because
+    the worker handling it died before storing a response. The conditional
+    UPDATE lets a single retry win. Returns True if this request owns the key.
+    """
+    reclaimed = db.session.execute(update(IdempotencyRecord).where(
+        IdempotencyRecord.client == client,
+        IdempotencyRecord.key == key,
+        IdempotencyRecord.status_code.is_(None),
+        IdempotencyRecord.created_at < now - idempotency_lease()
+    ).values(
+        request_hash=fingerprint, created_at=now, expires_at=now + idempotency_ttl()
+    )).rowcount == 1
+    db.session.commit()
+    return reclaimed
+
+def before_idempotent_request():
+    if not is_covered_request():
+        return None
+
+    key = request.headers[IDEMPOTENCY_HEADER].strip()
+    if not key or len(key) > 255:
+        return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be between 1 and 255 characters'}), 400
+
+    client = request_client()
+    fingerprint = request_fingerprint()
+    now = datetime.datetime.utcnow()
+
+    record = claim_key(client, key, fingerprint, now)
+    if record is not None and record.expires_at <= now:
+        # Expired but not evicted yet, start over
+        db.session.delete(record)
+        db.session.commit()
+        record = claim_key(client, key, fingerprint, now)
+
+    if record is None:
+        g.idempotency_key = (client, key)
+        return None
+    if record.request_hash != fingerprint:
+        return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+    if record.status_code is None:
+        if reclaim_abandoned_key(client, key, fingerprint, now):
+            g.idempotency_key = (client, key)
+            return None
+        return jsonify({'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'}), 409
+
+    response = current_app.response_class(record.response_body, status=record.status_code, content_type=record.content_type)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def after_idempotent_request(response):
+    idempotency_key = g.pop('idempotency_key', None)
+    if idempotency_key is None:
+        return response
+
+    client, key = idempotency_key
+    try:
+        if response.status_code >= 500 or response.is_streamed:
+            # Let the client retry server errors for real. The failed route may
+            # have left its transaction open, discard it first.
+            db.session.rollback()
+            db.session.execute(delete(IdempotencyRecord).where(
+                IdempotencyRecord.client == client, IdempotencyRecord.key == key
+            ))
+        else:
+            db.session.execute(update(IdempotencyRecord).where(
+                IdempotencyRecord.client == client, IdempotencyRecord.key == key
+            ).values(
+                status_code=response.status_code,
+                content_type=response.content_type,
+                response_body=response.get_data(as_text=True)
+            ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error storing idempotent response: {str(e)}")
+
+    return response
+
+def evict_expired_idempotency_records():
+    """
+    Deletes expired records with one statement on the expires_at index.
+    Returns the number deleted.
+    """
+    deleted = db.session.execute(
+        delete(IdempotencyRecord).where(IdempotencyRecord.expires_at < datetime.datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+def init_idempotency(app):
+    """
+    Serves retried POST requests carrying an Idempotency-Key header from the
+    stored response of the first attempt, without running the route again
+    """
+    app.before_request(before_idempotent_request)
+    app.after_request(after_idempotent_request)
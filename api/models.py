@@ -8,14 +8,14 @@ class Employee(db.Model):
     __tablename__ = 'employees'
     
     id = db.Column(db.String(36), primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     email = db.Column(db.String(100), nullable=False, unique=True)
     phone = db.Column(db.String(20), nullable=True)
     position = db.Column(db.String(100), nullable=False)
-    department = db.Column(db.String(100), nullable=False)
-    hire_date = db.Column(db.Date, nullable=True)
+    department = db.Column(db.String(100), nullable=False, index=True)
+    hire_date = db.Column(db.Date, nullable=True, index=True)
     status = db.Column(db.String(20), default='active')
-    manager_id = db.Column(db.String(36), db.ForeignKey('employees.id'), nullable=True)
+    manager_id = db.Column(db.String(36), db.ForeignKey('employees.id'), nullable=True, index=True)
     image_url = db.Column(db.String(255), nullable=True)
     password_hash = db.Column(db.String(255), nullable=True)
     
@@ -29,6 +29,35 @@ class Employee(db.Model):
     time_clock_entries = db.relationship('TimeClock', backref='employee', lazy='dynamic')
     created_announcements = db.relationship('Announcement', backref='creator', lazy='dynamic')
 
+class EmployeeSearchToken(db.Model):
+    __tablename__ = 'employee_search_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    token = db.Column(db.String(3), nullable=False)  # Trigram of a normalized word
+    field = db.Column(db.String(20), nullable=False)  # name, email or position
+    weight = db.Column(db.Integer, nullable=False, default=1)
+    employee_id = db.Column(db.String(36), db.ForeignKey('employees.id', ondelete='CASCADE'), nullable=False, index=True)
+    
+    __table_args__ = (
+        # Covering index for candidate lookups by trigram
+        db.Index('ix_employee_search_tokens_token', 'token', 'employee_id', 'field', 'weight'),
+    )
+
+class OrgClosure(db.Model):
+    __tablename__ = 'org_closure'
+    
+    # One row per (manager, report) pair at any distance, plus (employee, employee) at depth 0
+    ancestor_id = db.Column(db.String(36), db.ForeignKey('employees.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = db.Column(db.String(36), db.ForeignKey('employees.id', ondelete='CASCADE'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        # Subtree and span of control by depth
+        db.Index('ix_org_closure_ancestor_depth', 'ancestor_id', 'depth', 'descendant_id'),
+        # Chain of command
+        db.Index('ix_org_closure_descendant_depth', 'descendant_id', 'depth', 'ancestor_id'),
+    )
+
 class Department(db.Model):
     __tablename__ = 'departments'
     
@@ -56,6 +85,62 @@ class Absence(db.Model):
     
     # Relationships
     approver = db.relationship('Employee', foreign_keys=[approved_by])
+    
+    __table_args__ = (
+        # "Approved absence covering day X" per employee; seeking on end_date keeps
+        # the lookup bounded as absence history grows
+        db.Index('ix_absences_employee_status_end', 'employee_id', 'status', 'end_date', 'start_date'),
+        # Date window overlap queries (calendar, coverage)
+        db.Index('ix_absences_status_dates', 'status', 'start_date', 'end_date'),
+        # Pending absences of a set of employees (manager inbox)
+        db.Index('ix_absences_status_employee', 'status', 'employee_id', 'request_date'),
+    )
+
+class Holiday(db.Model):
+    __tablename__ = 'holidays'
+    
+    id = db.Column(db.String(36), primary_key=True)
+    date = db.Column(db.Date, nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+
+class HolidayCalendarVersion(db.Model):
+    __tablename__ = 'holiday_calendar_version'
+    
+    # Single row (id 1) bumped by every holiday change, so each process can tell
+    # when its cached working-day calendar is stale
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class LeaveAccrualRule(db.Model):
+    __tablename__ = 'leave_accrual_rules'
+    
+    id = db.Column(db.String(36), primary_key=True)
+    # Rules without an employee apply to everyone; an employee rule overrides them
+    employee_id = db.Column(db.String(36), db.ForeignKey('employees.id', ondelete='CASCADE'), nullable=True, index=True)
+    absence_type = db.Column(db.String(50), nullable=False)
+    annual_days = db.Column(db.Float, nullable=False)
+
+class LeaveLedgerEntry(db.Model):
+    __tablename__ = 'leave_ledger'
+    
+    # Append-only record of leave taken (positive) and given back (negative)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    employee_id = db.Column(db.String(36), db.ForeignKey('employees.id', ondelete='CASCADE'), nullable=False)
+    absence_id = db.Column(db.String(36), nullable=True, index=True)  # Kept after the absence is deleted
+    absence_type = db.Column(db.String(50), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    days = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class LeaveBalance(db.Model):
+    __tablename__ = 'leave_balances'
+    
+    # Materialized sum of the ledger per employee, year and absence type
+    employee_id = db.Column(db.String(36), db.ForeignKey('employees.id', ondelete='CASCADE'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    absence_type = db.Column(db.String(50), primary_key=True)
+    days_taken = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class PerformanceReview(db.Model):
     __tablename__ = 'performance_reviews'
@@ -74,6 +159,11 @@ class PerformanceReview(db.Model):
     reviewer = db.relationship('Employee', foreign_keys=[reviewer_id])
     goals = db.relationship('PerformanceGoal', backref='review', lazy='dynamic')
     skill_assessments = db.relationship('SkillAssessment', backref='review', lazy='dynamic')
+    
+    __table_args__ = (
+        # Latest review per employee
+        db.Index('ix_performance_reviews_employee_date', 'employee_id', 'review_date'),
+    )
 
 class PerformanceGoal(db.Model):
     __tablename__ = 'performance_goals'
@@ -106,6 +196,38 @@ class TimeClock(db.Model):
     clock_out_time = db.Column(db.String(8), nullable=True)  # Format: HH:MM:SS
     total_hours = db.Column(db.Float, nullable=True)
     status = db.Column(db.String(20), default='active')  # active or completed
+    
+    # Native timestamps written alongside the string columns above, which keep
+    # the API shape. Queries filter and order on these.
+    clock_in_at = db.Column(db.DateTime, nullable=True)
+    clock_out_at = db.Column(db.DateTime, nullable=True)
+    
+    # Equals employee_id while the entry is active and NULL once completed. The
+    # unique index allows one active entry per employee (NULLs do not collide).
+    active_employee_id = db.Column(db.String(36), nullable=True, unique=True)
+    
+    __table_args__ = (
+        db.Index('ix_time_clock_employee_date', 'employee_id', 'date'),
+        db.Index('ix_time_clock_employee_clock_in', 'employee_id', 'clock_in_at'),
+        # Covers the date range scans of the timesheet summary
+        db.Index('ix_time_clock_clock_in_hours', 'clock_in_at', 'employee_id', 'total_hours'),
+    )
+
+class TimeClockEvent(db.Model):
+    __tablename__ = 'time_clock_events'
+    
+    # Punch received from an offline kiosk. The client generated id makes
+    # replaying a batch idempotent.
+    id = db.Column(db.String(64), primary_key=True)
+    employee_id = db.Column(db.String(36), db.ForeignKey('employees.id', ondelete='CASCADE'), nullable=False)
+    type = db.Column(db.String(3), nullable=False)  # in or out
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    time_clock_id = db.Column(db.String(36), db.ForeignKey('time_clock.id', ondelete='SET NULL'), nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_time_clock_events_employee_occurred', 'employee_id', 'occurred_at'),
+    )
 
 # New Announcement model
 class Announcement(db.Model):
@@ -128,3 +250,27 @@ class Announcement(db.Model):
     # Audit timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class IdempotencyRecord(db.Model):
+    __tablename__ = 'idempotency_records'
+    
+    # Stored response of a POST sent with an Idempotency-Key header
+    client = db.Column(db.String(64), primary_key=True)  # Hash of the caller's credentials or address
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)  # NULL while the first request is in progress
+    content_type = db.Column(db.String(100), nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class ScheduledJob(db.Model):
+    __tablename__ = 'scheduled_jobs'
+    
+    # One row per background job, doubling as the cross-process run lock
+    name = db.Column(db.String(50), primary_key=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    last_duration = db.Column(db.Float, nullable=True)  # Seconds
+    last_error = db.Column(db.Text, nullable=True)
@@ -1,6 +1,8 @@
 from flask import Blueprint
 from .absence_routes import absences_bp
 from .absence_status_routes import absence_status_bp
+from .leave_routes import leave_bp
+from .absence_inbox_routes import absence_inbox_bp
 
 # Create a combined blueprint for absences
 absences_combined_bp = Blueprint('absences_combined', __name__, url_prefix='/absences')
@@ -8,6 +10,8 @@ absences_combined_bp = Blueprint('absences_combined', __name__, url_prefix='/abs
 # Register the sub-blueprints without url_prefix (it's already in the combined blueprint)
 absences_combined_bp.register_blueprint(absences_bp)
 absences_combined_bp.register_blueprint(absence_status_bp)
+absences_combined_bp.register_blueprint(leave_bp)
+absences_combined_bp.register_blueprint(absence_inbox_bp)
 
 # Move the status update to be handled by the app context in app.py instead
 # This prevents the circular import issue
@@ -0,0 +1,75 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func
+from models import db, Absence, Employee
+from schemas import AbsenceSchema
+from routes.org_hierarchy import reports_subquery
+from routes.pagination import clamp_page_size
+from .absence_utils import add_working_days
+
+absence_inbox_bp = Blueprint('absence_inbox', __name__)
+absence_schema = AbsenceSchema()
+
+def inbox_reports(manager_id):
+    # Direct reports only with ?direct=true, otherwise the whole reporting tree
+    direct_only = request.args.get('direct', '').lower() in ['true', '1']
+    return reports_subquery(manager_id, max_depth=1 if direct_only else None)
+
+@absence_inbox_bp.route('/inbox/<manager_id>', methods=['GET'])
+def get_approval_inbox(manager_id):
+    # Pending absences of the manager's reports, longest waiting first
+    Employee.query.get_or_404(manager_id)
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = clamp_page_size(request.args.get('pageSize', 10, type=int))
+    
+    reports = inbox_reports(manager_id)
+    total_count = db.session.query(func.count(Absence.id)).join(
+        reports, Absence.employee_id == reports.c.id
+    ).filter(Absence.status == 'pending').scalar()
+    
+    rows = db.session.query(
+        Absence,
+        reports.c.depth,
+        Employee.name,
+        Employee.department,
+        Employee.position,
+        Employee.image_url
+    ).join(
+        reports, Absence.employee_id == reports.c.id
+    ).join(
+        Employee, Absence.employee_id == Employee.id
+    ).filter(
+        Absence.status == 'pending'
+    ).order_by(
+        Absence.request_date.asc(),
+        Absence.id
+    ).limit(page_size).offset((page - 1) * page_size).all()
+    
+    result_data = []
+    for absence, depth, employee_name, department, position, image_url in rows:
+        absence_data = absence_schema.dump(absence)
+        absence_data['employeeName'] = employee_name
+        absence_data['department'] = department
+        absence_data['position'] = position
+        absence_data['imageUrl'] = image_url
+        # 1 for direct reports, 2 for their reports and so on
+        absence_data['reportingDepth'] = depth
+        add_working_days(absence_data, absence)
+        result_data.append(absence_data)
+    
+    return jsonify({
+        'data': result_data,
+        'totalCount': total_count,
+        'page': page,
+        'pageSize': page_size
+    })
+
+@absence_inbox_bp.route('/inbox/<manager_id>/count', methods=['GET'])
+def get_approval_inbox_count(manager_id):
+    # Badge count: a single COUNT joining the closure table to the (status, employee_id) index
+    reports = inbox_reports(manager_id)
+    pending = db.session.query(func.count(Absence.id)).join(
+        reports, Absence.employee_id == reports.c.id
+    ).filter(Absence.status == 'pending').scalar()
+    
+    return jsonify({'data': {'managerId': manager_id, 'pending': pending}})
@@ -1,9 +1,16 @@
 
 from flask import Blueprint, request, jsonify
 import uuid
+from sqlalchemy import func
 from models import db, Absence, Employee
 from schemas import AbsenceSchema
-from .absence_utils import update_employee_statuses_based_on_absences, enrich_absence_with_employee
+from routes.pagination import clamp_page_size
+from .absence_utils import (
+    refresh_employee_statuses, enrich_absence_with_employee, add_working_days, absence_filter_conditions,
+    parse_facets, absence_facet_counts, parse_date_range, overlapping_absences_condition,
+    daily_absence_counts, find_overlapping_absences
+)
+from .leave_utils import sync_absence_ledger
 import datetime
 
 absences_bp = Blueprint('absences', __name__)
@@ -12,98 +19,53 @@ absences_schema = AbsenceSchema(many=True)
 
 @absences_bp.route('', methods=['GET'])
 def get_absences():
-    print(f"=== ABSENCES DEBUG - FUNCTION CALLED ===")
-    
-    # Get query parameters for filtering and pagination
-    page = request.args.get('page', 1, type=int)
-    page_size = request.args.get('pageSize', 10, type=int)
-    employee_id = request.args.get('employeeId', '')
-    type = request.args.get('type', '')
-    status = request.args.get('status', '')
-    start_date = request.args.get('startDate', '')
-    end_date = request.args.get('endDate', '')
-    department = request.args.get('department', '')
-    exclude_employee_id = request.args.get('excludeEmployeeId', '')
-    
-    print(f"=== ABSENCES DEBUG ===")
-    print(f"Query params: page={page}, pageSize={page_size}, employeeId={employee_id}, status={status}, department={department}, excludeEmployeeId={exclude_employee_id}")
-    print(f"Raw request args: {dict(request.args)}")
+    # Get query parameters for pagination, filters are read by absence_filter_conditions
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = clamp_page_size(request.args.get('pageSize', 10, type=int))
     
-    # Start building the query
-    query = Absence.query
+    try:
+        facets = parse_facets(request.args.get('facets', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Apply filters
-    if employee_id:
-        query = query.filter(Absence.employee_id == employee_id)
-        print(f"Applied employee_id filter: {employee_id}")
+    conditions, needs_employee_join = absence_filter_conditions(request.args)
     
-    if department:
-        # Filter by department through employee relationship - explicitly specify the join condition
-        query = query.join(Employee, Absence.employee_id == Employee.id).filter(Employee.department == department)
-        print(f"Applied department filter: {department}")
-    
-    # Apply exclude_employee_id filter AFTER department filter
-    if exclude_employee_id:
-        query = query.filter(Absence.employee_id != exclude_employee_id)
-        print(f"Excluded employee_id: {exclude_employee_id}")
-    
-    if type:
-        query = query.filter(Absence.type == type)
-        print(f"Applied type filter: {type}")
-    
-    if status:
-        query = query.filter(Absence.status == status)
-        print(f"Applied status filter: {status}")
-    
-    if start_date:
-        query = query.filter(Absence.start_date >= start_date)
-        print(f"Applied start_date filter: {start_date}")
-    
-    if end_date:
-        query = query.filter(Absence.end_date <= end_date)
-        print(f"Applied end_date filter: {end_date}")
-    
-    # Check all absences before sorting to see status distribution
-    all_absences_for_debug = query.all()
-    status_count = {}
-    for abs in all_absences_for_debug:
-        status_count[abs.status] = status_count.get(abs.status, 0) + 1
-    print(f"Status distribution before sorting: {status_count}")
+    # Total count without ordering or employee columns
+    count_query = db.session.query(func.count(Absence.id))
+    if needs_employee_join:
+        count_query = count_query.join(Employee, Absence.employee_id == Employee.id)
+    total_count = count_query.filter(*conditions).scalar()
     
+    # Fetch the page together with the employee columns in one query
     # Order by status with pending first, then by request_date descending
-    # Using a simpler approach: order by status != 'pending', then by request_date
-    query = query.order_by(
+    rows = db.session.query(
+        Absence,
+        Employee.name,
+        Employee.department,
+        Employee.position,
+        Employee.image_url
+    ).outerjoin(
+        Employee, Absence.employee_id == Employee.id
+    ).filter(
+        *conditions
+    ).order_by(
         (Absence.status != 'pending').asc(),
         Absence.request_date.desc()
-    )
-    
-    print(f"Applied ordering: pending first, then by request_date desc")
-    
-    # Get total count before pagination
-    total_count = query.count()
-    print(f"Total count: {total_count}")
-    
-    # Apply pagination
-    absences = query.paginate(page=page, per_page=page_size, error_out=False).items
-    
-    # Debug: Print the status of each absence in the result
-    print(f"Absences on page {page}:")
-    for i, abs in enumerate(absences):
-        print(f"  {i+1}. ID: {abs.id[:8]}..., Status: {abs.status}, Request Date: {abs.request_date}")
+    ).limit(page_size).offset((page - 1) * page_size).all()
     
     # Prepare response with enhanced employee details
     result_data = []
     
-    for absence in absences:
+    for absence, employee_name, department, position, image_url in rows:
         absence_data = absence_schema.dump(absence)
         
-        # Get employee details
-        employee = Employee.query.get(absence.employee_id)
-        if employee:
-            absence_data['employeeName'] = employee.name
-            absence_data['department'] = employee.department
-            absence_data['position'] = employee.position
-            absence_data['imageUrl'] = employee.image_url
+        if employee_name is not None:
+            absence_data['employeeName'] = employee_name
+            absence_data['department'] = department
+            absence_data['position'] = position
+            absence_data['imageUrl'] = image_url
+        
+        add_working_days(absence_data, absence)
         
         # Ensure requestDate is properly formatted
         if absence.request_date:
@@ -114,8 +76,6 @@ def get_absences():
         
         result_data.append(absence_data)
     
-    print(f"=== END DEBUG ===")
-    
     # Prepare response
     result = {
         'data': result_data,
@@ -124,8 +84,75 @@ def get_absences():
         'pageSize': page_size
     }
     
+    if facets:
+        result['facets'] = absence_facet_counts(request.args, facets)
+    
     return jsonify(result)
 
+@absences_bp.route('/facets', methods=['GET'])
+def get_absence_facets():
+    # Per-status/type counts under the listing filters, without fetching rows
+    try:
+        facets = parse_facets(request.args.get('facets', 'status'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'data': absence_facet_counts(request.args, facets)})
+
+@absences_bp.route('/calendar', methods=['GET'])
+def get_absence_calendar():
+    # Approved absences overlapping a date window, with per-day counts of people out
+    try:
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    department = request.args.get('department', '')
+    
+    query = db.session.query(
+        Absence,
+        Employee.name,
+        Employee.department,
+        Employee.position,
+        Employee.image_url
+    ).join(
+        Employee, Absence.employee_id == Employee.id
+    ).filter(overlapping_absences_condition(start, end))
+    
+    if department:
+        query = query.filter(Employee.department == department)
+    
+    rows = query.order_by(Absence.start_date, Absence.employee_id).all()
+    
+    counts = daily_absence_counts(
+        [(absence.employee_id, absence.start_date, absence.end_date) for absence, *_ in rows],
+        start,
+        end
+    )
+    
+    absences = []
+    for absence, employee_name, employee_department, position, image_url in rows:
+        absence_data = absence_schema.dump(absence)
+        absence_data['employeeName'] = employee_name
+        absence_data['department'] = employee_department
+        absence_data['position'] = position
+        absence_data['imageUrl'] = image_url
+        add_working_days(absence_data, absence)
+        absences.append(absence_data)
+    
+    result = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'department': department or None,
+        'days': [
+            {'date': (start + datetime.timedelta(days=offset)).isoformat(), 'count': count}
+            for offset, count in enumerate(counts)
+        ],
+        'absences': absences
+    }
+    
+    return jsonify({'data': result})
+
 @absences_bp.route('/<id>', methods=['GET'])
 def get_absence(id):
     absence = Absence.query.get_or_404(id)
@@ -133,6 +160,7 @@ def get_absence(id):
     
     # Enrich with employee details
     absence_data = enrich_absence_with_employee(absence_data, absence.employee_id)
+    add_working_days(absence_data, absence)
     
     return jsonify({'data': absence_data})
 
@@ -151,6 +179,13 @@ def create_absence():
         if 'endDate' in json_data:
             json_data['end_date'] = json_data.pop('endDate')
     
+    # When set, overlapping requests are rejected instead of flagged
+    reject_overlaps = json_data.pop('rejectOverlaps', False) if json_data else False
+    if isinstance(reject_overlaps, str) and reject_overlaps.lower() in ['true', '1', 'false', '0']:
+        reject_overlaps = reject_overlaps.lower() in ['true', '1']
+    if not isinstance(reject_overlaps, bool):
+        return jsonify({'error': 'rejectOverlaps must be a boolean'}), 400
+    
     try:
         data = absence_schema.load(json_data)
     except Exception as e:
@@ -161,6 +196,16 @@ def create_absence():
     if not employee:
         return jsonify({'error': 'Employee not found'}), 404
     
+    # Check for pending or approved absences on the same dates
+    conflicts = absences_schema.dump(
+        find_overlapping_absences(data['employee_id'], data['start_date'], data['end_date'])
+    )
+    if conflicts and reject_overlaps:
+        return jsonify({
+            'error': 'Absence overlaps existing pending or approved absences',
+            'conflicts': conflicts
+        }), 409
+    
     # Create new absence
     new_absence = Absence(
         id=str(uuid.uuid4()),
@@ -176,13 +221,16 @@ def create_absence():
     db.session.add(new_absence)
     
     try:
+        refresh_employee_statuses([new_absence.employee_id])
+        sync_absence_ledger([new_absence])
         db.session.commit()
         
         # Enrich the response with employee details
         result = absence_schema.dump(new_absence)
         result = enrich_absence_with_employee(result, employee.id)
+        add_working_days(result, new_absence)
         
-        return jsonify({'data': result}), 201
+        return jsonify({'data': result, 'conflicts': conflicts}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -209,15 +257,19 @@ def update_absence(id):
         return jsonify({'error': str(e)}), 400
     
     # Update absence fields
+    previous_employee_id = absence.employee_id
     for key, value in data.items():
         setattr(absence, key, value)
     
     try:
+        refresh_employee_statuses([previous_employee_id, absence.employee_id])
+        sync_absence_ledger([absence])
         db.session.commit()
         
         # Enrich the response with employee details
         result = absence_schema.dump(absence)
         result = enrich_absence_with_employee(result, absence.employee_id)
+        add_working_days(result, absence)
         
         return jsonify({'data': result})
     except Exception as e:
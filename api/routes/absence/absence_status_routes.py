@@ -1,13 +1,55 @@
 
 from flask import Blueprint, request, jsonify
-from models import db, Absence, Employee
+from sqlalchemy import update
+from models import db, Absence
 from schemas import AbsenceSchema
-from .absence_utils import update_employee_statuses_based_on_absences, enrich_absence_with_employee
-import datetime
+from .absence_utils import refresh_employee_statuses, enrich_absence_with_employee, absence_coverage, parse_min_on_duty
+from .leave_utils import sync_absence_ledger
 
 absence_status_bp = Blueprint('absence_status', __name__)
 absence_schema = AbsenceSchema()
 
+@absence_status_bp.route('/status', methods=['PUT'])
+def bulk_update_absence_status():
+    # Approve or decline many absences at once, in one transaction
+    json_data = request.get_json()
+    ids = json_data.get('ids') if isinstance(json_data, dict) else None
+    if not isinstance(ids, list) or not ids or not all(isinstance(absence_id, str) for absence_id in ids):
+        return jsonify({'error': 'A non-empty list of absence ids is required'}), 400
+    
+    status = json_data.get('status')
+    if status not in ['pending', 'approved', 'declined']:
+        return jsonify({'error': 'Invalid status value'}), 400
+    
+    ids = list(dict.fromkeys(ids))
+    absences = Absence.query.filter(Absence.id.in_(ids)).all()
+    found_ids = {absence.id for absence in absences}
+    missing_ids = [absence_id for absence_id in ids if absence_id not in found_ids]
+    
+    values = {'status': status}
+    if status == 'approved':
+        values['approved_by'] = json_data.get('approvedBy')
+    
+    try:
+        updated = 0
+        if absences:
+            # One UPDATE for all of them; 'evaluate' also updates the loaded objects
+            updated = db.session.execute(
+                update(Absence)
+                .where(Absence.id.in_(found_ids))
+                .values(values)
+                .execution_options(synchronize_session='evaluate')
+            ).rowcount
+            sync_absence_ledger(absences)
+            refresh_employee_statuses([absence.employee_id for absence in absences])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error updating absence statuses: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({'data': {'status': status, 'updated': updated, 'missingIds': missing_ids}})
+
 @absence_status_bp.route('/<id>/status', methods=['PUT'])
 def update_absence_status(id):
     absence = Absence.query.get_or_404(id)
@@ -23,70 +65,64 @@ def update_absence_status(id):
     if status not in ['pending', 'approved', 'declined']:
         return jsonify({'error': 'Invalid status value'}), 400
     
+    try:
+        min_on_duty = parse_min_on_duty(json_data.get('minOnDuty'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     # Update status
     absence.status = status
     
-    # If approving, set the approver and update employee status
+    # If approving, record the approver
     if status == 'approved':
         absence.approved_by = json_data.get('approvedBy')
-        
-        # Update employee status to on-leave if the absence covers the current date
-        employee = Employee.query.get(absence.employee_id)
-        if employee:
-            # Get today's date as a datetime.date object
-            today = datetime.datetime.now().date()
-            
-            # Make sure we're comparing date objects to date objects, not strings
-            # Check if absence is current OR starts in the future
-            is_current_or_future = (absence.start_date <= today and absence.end_date >= today) or \
-                                   (absence.start_date > today)
-            
-            if is_current_or_future:
-                # If current, set to on-leave immediately
-                if absence.start_date <= today and absence.end_date >= today:
-                    employee.status = 'on-leave'
-                    print(f"Setting employee {employee.name} status to on-leave because absence is current")
-    elif status == 'declined':
-        # If declining an absence that would be active today, make sure employee status is updated
-        employee = Employee.query.get(absence.employee_id)
-        if employee and employee.status == 'on-leave':
-            # Check if this was the only approved absence for today
-            today = datetime.datetime.now().date()
-            other_active_absences = Absence.query.filter(
-                Absence.employee_id == absence.employee_id,
-                Absence.status == 'approved',
-                Absence.start_date <= today,
-                Absence.end_date >= today,
-                Absence.id != absence.id  # Exclude the current absence being declined
-            ).count()
-            
-            if other_active_absences == 0:
-                employee.status = 'out-of-office'
-                print(f"Declined absence for {employee.name} - setting status to out-of-office")
     
     try:
+        # Only the employee of this absence can change status (e.g. on-leave today)
+        refresh_employee_statuses([absence.employee_id])
+        # Post the days taken (or give them back) on the leave ledger
+        sync_absence_ledger([absence])
         db.session.commit()
-        
-        # Now check if we need to update any employee statuses
-        # This ensures all employees with approved absences are properly marked
-        update_employee_statuses_based_on_absences()
-        
-        # Enrich the response with employee details
-        result = absence_schema.dump(absence)
-        result = enrich_absence_with_employee(result, absence.employee_id)
-        
-        return jsonify({'data': result})
     except Exception as e:
         db.session.rollback()
         print(f"Error updating absence status: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    
+    # Enrich the response with employee details
+    result = absence_schema.dump(absence)
+    result = enrich_absence_with_employee(result, absence.employee_id)
+    
+    response = {'data': result}
+    if status == 'approved':
+        # Department staffing over the absence dates, now that it is approved
+        response['coverage'] = absence_coverage(absence, min_on_duty)
+    
+    return jsonify(response)
+
+@absence_status_bp.route('/<id>/coverage', methods=['GET'])
+def get_absence_coverage(id):
+    # Preview the department's on-duty headcount per day if this absence is approved
+    absence = Absence.query.get_or_404(id)
+    try:
+        min_on_duty = parse_min_on_duty(request.args.get('minOnDuty'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    coverage = absence_coverage(absence, min_on_duty)
+    if coverage is None:
+        return jsonify({'error': 'Employee not found'}), 404
+    
+    return jsonify({'data': coverage})
 
 @absence_status_bp.route('/<id>', methods=['DELETE'])
 def delete_absence(id):
     absence = Absence.query.get_or_404(id)
     
     try:
+        employee_id = absence.employee_id
+        sync_absence_ledger([absence], deleted=True)
         db.session.delete(absence)
+        refresh_employee_statuses([employee_id])
         db.session.commit()
         return jsonify({'data': {'message': f'Absence {id} deleted successfully'}}), 200
     except Exception as e:
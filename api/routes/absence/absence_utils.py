@@ -1,5 +1,7 @@
-
 from models import db, Absence, Employee, TimeClock
+from sqlalchemy import update, exists, case, and_, or_, func
+from routes.time_clock_utils import day_bounds
+from .working_days import working_day_calendar
 import datetime
 
 def enrich_absence_with_employee(absence_data, employee_id):
@@ -12,70 +14,351 @@ def enrich_absence_with_employee(absence_data, employee_id):
         absence_data['department'] = employee.department
         absence_data['position'] = employee.position
         absence_data['imageUrl'] = employee.image_url
-    
+
+    return absence_data
+
+def add_working_days(absence_data, absence):
+    """
+    Adds the number of working days (weekdays that are not holidays) the
+    absence spans
+    """
+    if absence.start_date and absence.end_date:
+        absence_data['workingDays'] = working_day_calendar.working_days(absence.start_date, absence.end_date)
     return absence_data
 
-def update_employee_statuses_based_on_absences():
+def absence_filter_conditions(args, skip=()):
+    """
+    Builds the filter conditions of the absence listing from request args.
+    Returns (conditions, needs_employee_join). Filters whose argument name is
+    in `skip` are left out.
+    """
+    filters = {
+        'employeeId': lambda value: Absence.employee_id == value,
+        'department': lambda value: Employee.department == value,
+        'excludeEmployeeId': lambda value: Absence.employee_id != value,
+        'type': lambda value: Absence.type == value,
+        'status': lambda value: Absence.status == value,
+        'startDate': lambda value: Absence.start_date >= value,
+        'endDate': lambda value: Absence.end_date <= value
+    }
+
+    conditions = []
+    for name, condition in filters.items():
+        value = args.get(name, '')
+        if value and name not in skip:
+            conditions.append(condition(value))
+
+    needs_employee_join = bool(args.get('department')) and 'department' not in skip
+    return conditions, needs_employee_join
+
+# Columns the absence listing can be faceted on
+ABSENCE_FACETS = {
+    'status': Absence.status,
+    'type': Absence.type
+}
+
+ABSENCE_STATUSES = ['pending', 'approved', 'declined']
+
+def parse_facets(value):
+    """
+    Parses a comma separated facets argument. Raises ValueError for unknown facets.
+    """
+    facets = [facet.strip() for facet in value.split(',') if facet.strip()]
+    unknown = [facet for facet in facets if facet not in ABSENCE_FACETS]
+    if unknown:
+        raise ValueError(f'Invalid facets: {", ".join(unknown)}. Must be among {", ".join(ABSENCE_FACETS)}')
+    return facets
+
+def absence_facet_counts(args, facets):
+    """
+    Returns {facet: {value: count}} computed with one GROUP BY per facet under
+    the listing filters in `args`. Each facet ignores its own filter, so the
+    status counts stay visible while the list is filtered to one status.
+    """
+    result = {}
+    for facet in facets:
+        column = ABSENCE_FACETS[facet]
+        conditions, needs_employee_join = absence_filter_conditions(args, skip=(facet,))
+
+        query = db.session.query(column, func.count(Absence.id))
+        if needs_employee_join:
+            query = query.join(Employee, Absence.employee_id == Employee.id)
+        counts = dict(query.filter(*conditions).group_by(column).all())
+
+        if facet == 'status':
+            counts = {**{status: 0 for status in ABSENCE_STATUSES}, **counts}
+        result[facet] = counts
+
+    return result
+
+# Longest window the calendar and coverage computations accept, in days
+MAX_CALENDAR_DAYS = 400
+
+def parse_date_range(start_value, end_value):
+    """
+    Parses a YYYY-MM-DD date range. Raises ValueError if a date is missing or
+    invalid, the range is reversed or longer than MAX_CALENDAR_DAYS.
+    """
+    if not start_value or not end_value:
+        raise ValueError('Both start and end dates are required (YYYY-MM-DD)')
+    try:
+        start = datetime.datetime.strptime(start_value, '%Y-%m-%d').date()
+        end = datetime.datetime.strptime(end_value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('Dates must use the YYYY-MM-DD format')
+    if end < start:
+        raise ValueError('End date must not be before start date')
+    if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+        raise ValueError(f'Date range cannot exceed {MAX_CALENDAR_DAYS} days')
+    return start, end
+
+def parse_min_on_duty(value):
+    """
+    Parses the optional minOnDuty staffing threshold. Returns None if absent;
+    raises ValueError unless it is a non-negative integer.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError('minOnDuty must be a non-negative integer')
+    try:
+        min_on_duty = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('minOnDuty must be a non-negative integer')
+    if isinstance(value, float) and value != min_on_duty or min_on_duty < 0:
+        raise ValueError('minOnDuty must be a non-negative integer')
+    return min_on_duty
+
+def overlapping_absences_condition(start, end, statuses=('approved',)):
+    """
+    Absences in the given statuses overlapping [start, end]. Served by the
+    (status, start_date, end_date) index.
+    """
+    return and_(
+        Absence.status.in_(statuses),
+        Absence.start_date <= end,
+        Absence.end_date >= start
+    )
+
+def find_overlapping_absences(employee_id, start, end, exclude_id=None):
+    """
+    Returns the employee's pending or approved absences overlapping [start, end].
+
+    Uses the (employee_id, status, end_date, start_date) index: seeking on
+    end_date >= start only visits absences that end after the new one starts,
+    so the lookup does not grow with the employee's past absence history.
+    """
+    query = Absence.query.filter(
+        Absence.employee_id == employee_id,
+        Absence.status.in_(['pending', 'approved']),
+        Absence.end_date >= start,
+        Absence.start_date <= end
+    )
+    if exclude_id:
+        query = query.filter(Absence.id != exclude_id)
+    return query.order_by(Absence.start_date).all()
+
+def daily_absence_counts(intervals, start, end):
     """
-    Updates all employee statuses based on current approved absences.
-    Should be run after absence approvals or on a regular schedule.
+    Returns the number of distinct employees out on each day of [start, end],
+    given (employee_id, start_date, end_date) intervals. Overlapping absences
+    of the same employee count once.
+    """
+    days = (end - start).days + 1
+    deltas = [0] * (days + 1)
+
+    by_employee = {}
+    for employee_id, absence_start, absence_end in intervals:
+        first = max((absence_start - start).days, 0)
+        last = min((absence_end - start).days, days - 1)
+        if first <= last:
+            by_employee.setdefault(employee_id, []).append((first, last))
+
+    for ranges in by_employee.values():
+        # Merge each employee's ranges so they are counted once per day
+        ranges.sort()
+        merged_first, merged_last = ranges[0]
+        for first, last in ranges[1:]:
+            if first <= merged_last + 1:
+                merged_last = max(merged_last, last)
+            else:
+                deltas[merged_first] += 1
+                deltas[merged_last + 1] -= 1
+                merged_first, merged_last = first, last
+        deltas[merged_first] += 1
+        deltas[merged_last + 1] -= 1
+
+    counts = []
+    running = 0
+    for day in range(days):
+        running += deltas[day]
+        counts.append(running)
+    return counts
+
+def department_coverage(department, start, end, extra_absence=None, min_on_duty=None):
+    """
+    Per-day staffing of a department over [start, end]: how many employees are
+    out on approved absences and how many remain on duty. `extra_absence` is
+    counted as if it were approved, to answer "what if I approve this one".
+    An empty range (end before start) has no days and everyone on duty.
+    """
+    headcount = db.session.query(func.count(Employee.id)).filter(
+        Employee.department == department,
+        or_(Employee.status.is_(None), Employee.status != 'inactive')
+    ).scalar()
+
+    intervals = db.session.query(
+        Absence.employee_id, Absence.start_date, Absence.end_date
+    ).join(
+        Employee, Absence.employee_id == Employee.id
+    ).filter(
+        Employee.department == department,
+        overlapping_absences_condition(start, end)
+    ).all()
+
+    if extra_absence is not None:
+        intervals.append((extra_absence.employee_id, extra_absence.start_date, extra_absence.end_date))
+
+    counts = daily_absence_counts(intervals, start, end)
+    days = [{
+        'date': (start + datetime.timedelta(days=offset)).isoformat(),
+        'out': out,
+        'onDuty': headcount - out
+    } for offset, out in enumerate(counts)]
+
+    busiest = max(days, key=lambda day: day['out'], default={'date': None, 'onDuty': headcount})
+    coverage = {
+        'department': department,
+        'headcount': headcount,
+        'minOnDuty': busiest['onDuty'],
+        'minOnDutyDate': busiest['date'],
+        'days': days
+    }
+    if min_on_duty is not None:
+        coverage['threshold'] = min_on_duty
+        coverage['belowThreshold'] = busiest['onDuty'] < min_on_duty
+
+    return coverage
+
+def absence_coverage(absence, min_on_duty=None):
+    """
+    Department coverage over the dates of an absence, assuming it is approved
+    """
+    employee = db.session.get(Employee, absence.employee_id)
+    if not employee:
+        return None
+    return department_coverage(
+        employee.department,
+        absence.start_date,
+        absence.end_date,
+        extra_absence=absence if absence.status != 'approved' else None,
+        min_on_duty=min_on_duty
+    )
+
+def target_status_expression(today):
+    """
+    SQL expression for the status an employee should have on `today`:
+    - on-leave if an approved absence covers today
+    - active (or remote, if already remote) while clocked in today
+    - out-of-office if they clocked in and out today
+    - otherwise out-of-office, keeping remote and out-of-office as they are
+    """
+    day_start, day_end = day_bounds(today)
+
+    on_leave = exists().where(
+        Absence.employee_id == Employee.id,
+        Absence.status == 'approved',
+        Absence.start_date <= today,
+        Absence.end_date >= today
+    )
+    clocked_in = exists().where(
+        TimeClock.employee_id == Employee.id,
+        TimeClock.clock_in_at >= day_start,
+        TimeClock.clock_in_at < day_end,
+        TimeClock.clock_out_time.is_(None)
+    )
+    clocked_today = exists().where(
+        TimeClock.employee_id == Employee.id,
+        TimeClock.clock_in_at >= day_start,
+        TimeClock.clock_in_at < day_end
+    )
+
+    return case(
+        (on_leave, 'on-leave'),
+        (and_(clocked_in, Employee.status == 'remote'), 'remote'),
+        (clocked_in, 'active'),
+        (clocked_today, 'out-of-office'),
+        (Employee.status.in_(['out-of-office', 'remote']), Employee.status),
+        else_='out-of-office'
+    )
+
+def status_update_statement(today, employee_ids=None):
+    """
+    Builds the UPDATE that moves employees to their target status, limited to
+    the given ids when provided. Only rows whose status changes are matched.
+    """
+    target_status = target_status_expression(today)
+
+    statement = (
+        update(Employee)
+        .where(or_(
+            Employee.status.is_(None),
+            # Skip inactive employees and rows that are already correct
+            and_(Employee.status != 'inactive', Employee.status != target_status)
+        ))
+        .values(status=target_status)
+        .execution_options(synchronize_session=False)
+    )
+    if employee_ids is not None:
+        statement = statement.where(Employee.id.in_(employee_ids))
+
+    return statement
+
+def refresh_employee_statuses(employee_ids, today=None):
+    """
+    Recomputes the status of the given employees only, as part of the caller's
+    transaction (nothing is committed). Call it from any write that can change
+    an employee's absences or clock entries.
+    """
+    employee_ids = list(set(employee_ids))
+    if not employee_ids:
+        return 0
+
+    today = today or datetime.datetime.now().date()
+    updated = db.session.execute(status_update_statement(today, employee_ids)).rowcount
+
+    # Loaded Employee objects for these ids may hold the old status
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, Employee) and obj.id in employee_ids:
+            db.session.expire(obj, ['status'])
+
+    return updated
+
+def update_employee_statuses_based_on_absences(today=None, raise_errors=False):
+    """
+    Full sweep: updates all employee statuses based on current approved absences
+    and today's clock entries. This is a maintenance operation for the daily
+    rollover; request handlers should use refresh_employee_statuses instead.
+
+    The target status of every employee is computed in SQL and applied with a
+    single set-based UPDATE that only touches rows whose status changes.
+    Returns the number of employees updated. Errors are logged and 0 returned
+    unless `raise_errors` is set.
     """
     # Get today's date as a datetime.date object, not a string
-    today = datetime.datetime.now().date()
+    today = today or datetime.datetime.now().date()
     print(f"Checking for employees who should be on leave today: {today}")
-    
-    # Get today's date in YYYY-MM-DD format for comparison
-    today_date = datetime.datetime.now().strftime("%Y-%m-%d")
-    
-    # Get all employees
-    employees = Employee.query.all()
-    
-    for employee in employees:
-        # Skip inactive employees
-        if employee.status == 'inactive':
-            continue
-            
-        # Check if employee has an approved absence for today
-        current_absence = Absence.query.filter(
-            Absence.employee_id == employee.id,
-            Absence.status == 'approved',
-            Absence.start_date <= today,
-            Absence.end_date >= today
-        ).first()
-        
-        if current_absence:
-            # If there's an approved absence covering today, set status to on-leave
-            if employee.status != 'on-leave':
-                print(f"Setting employee {employee.name} to on-leave due to approved absence")
-                employee.status = 'on-leave'
-        else:
-            # Employee doesn't have an active absence for today
-            # Check if they've clocked in today
-            clock_entry = TimeClock.query.filter(
-                TimeClock.employee_id == employee.id,
-                TimeClock.date == today_date
-            ).first()
-            
-            if clock_entry:
-                if clock_entry.clock_out_time:
-                    # Employee clocked in and out today
-                    if employee.status != 'out-of-office':
-                        print(f"Setting employee {employee.name} to out-of-office (clocked out)")
-                        employee.status = 'out-of-office'
-                else:
-                    # Employee is still clocked in
-                    if employee.status != 'active':
-                        print(f"Setting employee {employee.name} to active (still clocked in)")
-                        employee.status = 'active'
-            else:
-                # Employee hasn't clocked in today and has no absence
-                if employee.status not in ['out-of-office', 'remote']:
-                    print(f"Setting employee {employee.name} to out-of-office (no clock-in, no absence)")
-                    employee.status = 'out-of-office'
-    
+
     try:
+        updated = db.session.execute(status_update_statement(today)).rowcount
         db.session.commit()
-        print("Employee statuses updated successfully")
+        # Objects already loaded in this session may hold the old status
+        db.session.expire_all()
+        print(f"Employee statuses updated successfully ({updated} changed)")
+        return updated
     except Exception as e:
         db.session.rollback()
         print(f"Error updating employee statuses: {str(e)}")
+        if raise_errors:
+            raise
+        return 0
@@ -0,0 +1,156 @@
+from flask import Blueprint, request, jsonify
+import datetime
+import uuid
+from sqlalchemy import or_
+from models import db, Employee, Absence, LeaveAccrualRule, Holiday
+from .leave_utils import sync_absence_ledger
+from .working_days import working_day_calendar, bump_holiday_calendar_version
+
+leave_bp = Blueprint('leave', __name__)
+
+def rule_to_dict(rule):
+    return {
+        'id': rule.id,
+        'employeeId': rule.employee_id,
+        'type': rule.absence_type,
+        'annualDays': rule.annual_days
+    }
+
+@leave_bp.route('/leave-rules', methods=['GET'])
+def get_leave_rules():
+    # Company-wide rules, plus the overrides of one employee if requested
+    employee_id = request.args.get('employeeId', '')
+    
+    query = LeaveAccrualRule.query
+    if employee_id:
+        query = query.filter(or_(
+            LeaveAccrualRule.employee_id.is_(None),
+            LeaveAccrualRule.employee_id == employee_id
+        ))
+    
+    rules = query.order_by(LeaveAccrualRule.absence_type, LeaveAccrualRule.employee_id).all()
+    return jsonify({'data': [rule_to_dict(rule) for rule in rules]})
+
+@leave_bp.route('/leave-rules', methods=['PUT'])
+def set_leave_rule():
+    # Create or replace the rule for a type (company-wide, or for one employee)
+    json_data = request.get_json() or {}
+    absence_type = json_data.get('type')
+    annual_days = json_data.get('annualDays')
+    employee_id = json_data.get('employeeId')
+    
+    if not absence_type:
+        return jsonify({'error': 'Type is required'}), 400
+    
+    if not isinstance(annual_days, (int, float)) or annual_days < 0:
+        return jsonify({'error': 'annualDays must be a non-negative number'}), 400
+    
+    if employee_id and not Employee.query.get(employee_id):
+        return jsonify({'error': 'Employee not found'}), 404
+    
+    rule = LeaveAccrualRule.query.filter_by(employee_id=employee_id, absence_type=absence_type).first()
+    if rule:
+        rule.annual_days = annual_days
+    else:
+        rule = LeaveAccrualRule(
+            id=str(uuid.uuid4()),
+            employee_id=employee_id,
+            absence_type=absence_type,
+            annual_days=annual_days
+        )
+        db.session.add(rule)
+    
+    try:
+        db.session.commit()
+        return jsonify({'data': rule_to_dict(rule)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@leave_bp.route('/leave-rules/<id>', methods=['DELETE'])
+def delete_leave_rule(id):
+    rule = LeaveAccrualRule.query.get_or_404(id)
+    
+    try:
+        db.session.delete(rule)
+        db.session.commit()
+        return jsonify({'data': {'message': f'Leave rule {id} deleted successfully'}}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def holiday_to_dict(holiday):
+    return {
+        'id': holiday.id,
+        'date': holiday.date.isoformat(),
+        'name': holiday.name
+    }
+
+def resync_absences_on(date):
+    # Approved absences spanning a holiday change their working days, repost them
+    bump_holiday_calendar_version()
+    sync_absence_ledger(Absence.query.filter(
+        Absence.status == 'approved',
+        Absence.start_date <= date,
+        Absence.end_date >= date
+    ).all())
+
+@leave_bp.route('/holidays', methods=['GET'])
+def get_holidays():
+    # Holidays of one year (current year by default)
+    year = request.args.get('year', datetime.date.today().year, type=int)
+    
+    holidays = Holiday.query.filter(
+        Holiday.date >= datetime.date(year, 1, 1),
+        Holiday.date <= datetime.date(year, 12, 31)
+    ).order_by(Holiday.date).all()
+    return jsonify({'data': [holiday_to_dict(holiday) for holiday in holidays]})
+
+@leave_bp.route('/holidays', methods=['POST'])
+def create_holiday():
+    json_data = request.get_json() or {}
+    name = json_data.get('name')
+    
+    if not name:
+        return jsonify({'error': 'Name is required'}), 400
+    
+    try:
+        date = datetime.datetime.strptime(json_data.get('date') or '', '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Date is required (YYYY-MM-DD)'}), 400
+    
+    if Holiday.query.filter_by(date=date).first():
+        return jsonify({'error': f'A holiday already exists on {date.isoformat()}'}), 409
+    
+    holiday = Holiday(id=str(uuid.uuid4()), date=date, name=name)
+    db.session.add(holiday)
+    
+    try:
+        db.session.flush()
+        resync_absences_on(date)
+        db.session.commit()
+        return jsonify({'data': holiday_to_dict(holiday)}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        # Don't keep a year built from a rolled back change; other workers
+        # see the committed version bump
+        working_day_calendar.invalidate(date.year)
+
+@leave_bp.route('/holidays/<id>', methods=['DELETE'])
+def delete_holiday(id):
+    holiday = Holiday.query.get_or_404(id)
+    date = holiday.date
+    
+    try:
+        db.session.delete(holiday)
+        db.session.flush()
+        resync_absences_on(date)
+        db.session.commit()
+        return jsonify({'data': {'message': f'Holiday {id} deleted successfully'}}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        working_day_calendar.invalidate(date.year)
@@ -0,0 +1,178 @@
+from models import db, Absence, LeaveAccrualRule, LeaveLedgerEntry, LeaveBalance
+from sqlalchemy import select, delete, insert, func, or_
+from sqlalchemy.dialects import mysql, sqlite
+from .working_days import working_day_calendar
+import datetime
+
+def desired_ledger_postings(absence):
+    """
+    Returns {(employee_id, year, absence_type): days} that should be on the
+    ledger for an absence: its working days per year when approved, nothing
+    otherwise. An absence over New Year is charged to both years.
+    """
+    if absence.status != 'approved':
+        return {}
+    return {
+        (absence.employee_id, year, absence.type): days
+        for year, days in working_day_calendar.working_days_by_year(absence.start_date, absence.end_date).items()
+        if days
+    }
+
+def sync_absence_ledger(absences, deleted=False):
+    """
+    Brings the ledger and the materialized balances in line with the current
+    state of the given absences, inside the caller's transaction.
+
+    The ledger already holds the net days posted per absence, so each call only
+    appends the difference. Approving posts the days, declining or deleting an
+    approved absence posts the reversal, and date or type changes post both.
+    """
+    absences = list(absences)
+    if not absences:
+        return
+
+    posted = {}
+    rows = db.session.execute(
+        select(
+            LeaveLedgerEntry.absence_id,
+            LeaveLedgerEntry.employee_id,
+            LeaveLedgerEntry.year,
+            LeaveLedgerEntry.absence_type,
+            func.sum(LeaveLedgerEntry.days)
+        )
+        .where(LeaveLedgerEntry.absence_id.in_([absence.id for absence in absences]))
+        .group_by(
+            LeaveLedgerEntry.absence_id,
+            LeaveLedgerEntry.employee_id,
+            LeaveLedgerEntry.year,
+            LeaveLedgerEntry.absence_type
+        )
+    ).all()
+    for absence_id, employee_id, year, absence_type, days in rows:
+        posted.setdefault(absence_id, {})[(employee_id, year, absence_type)] = days
+
+    entries = []
+    balance_deltas = {}
+    now = datetime.datetime.utcnow()
+    for absence in absences:
+        desired = {} if deleted else desired_ledger_postings(absence)
+        current = posted.get(absence.id, {})
+        for key in set(desired) | set(current):
+            delta = desired.get(key, 0) - current.get(key, 0)
+            if abs(delta) < 1e-9:
+                continue
+            employee_id, year, absence_type = key
+            entries.append({
+                'employee_id': employee_id,
+                'absence_id': absence.id,
+                'absence_type': absence_type,
+                'year': year,
+                'days': delta,
+                'created_at': now
+            })
+            balance_deltas[key] = balance_deltas.get(key, 0) + delta
+
+    if entries:
+        db.session.execute(insert(LeaveLedgerEntry), entries)
+    apply_balance_deltas(balance_deltas)
+
+def balance_upsert_statement(dialect_name):
+    """
+    INSERT into leave_balances that adds days_taken onto an existing
+    (employee_id, year, absence_type) row instead of failing on it
+    """
+    if dialect_name == 'sqlite':
+        statement = sqlite.insert(LeaveBalance)
+        return statement.on_conflict_do_update(
+            index_elements=[LeaveBalance.employee_id, LeaveBalance.year, LeaveBalance.absence_type],
+            set_={
+                'days_taken': LeaveBalance.days_taken + statement.excluded.days_taken,
+                'updated_at': statement.excluded.updated_at
+            }
+        )
+    # MySQL: INSERT ... ON DUPLICATE KEY UPDATE
+    statement = mysql.insert(LeaveBalance)
+    return statement.on_duplicate_key_update(
+        days_taken=LeaveBalance.days_taken + statement.inserted.days_taken,
+        updated_at=statement.inserted.updated_at
+    )
+
+def apply_balance_deltas(balance_deltas):
+    """
+    Adds the deltas to the materialized balances, creating missing rows. A
+    single upsert, so concurrent postings for a new balance row can't collide.
+    """
+    if not balance_deltas:
+        return
+    now = datetime.datetime.utcnow()
+    db.session.execute(balance_upsert_statement(db.session.get_bind().dialect.name), [{
+        'employee_id': employee_id,
+        'year': year,
+        'absence_type': absence_type,
+        'days_taken': delta,
+        'updated_at': now
+    } for (employee_id, year, absence_type), delta in balance_deltas.items()])
+
+def entitlements_for(employee_id):
+    """
+    Returns {absence_type: annual_days} for an employee, with employee rules
+    overriding the company-wide ones
+    """
+    rules = LeaveAccrualRule.query.filter(
+        or_(LeaveAccrualRule.employee_id.is_(None), LeaveAccrualRule.employee_id == employee_id)
+    ).all()
+
+    entitlements = {}
+    for rule in sorted(rules, key=lambda rule: rule.employee_id is not None):
+        entitlements[rule.absence_type] = rule.annual_days
+    return entitlements
+
+def leave_balance(employee_id, year):
+    """
+    Leave entitlement, days taken and remaining per absence type for one
+    employee and year. Reads the materialized balances by primary key.
+    """
+    taken = {
+        balance.absence_type: balance.days_taken
+        for balance in LeaveBalance.query.filter_by(employee_id=employee_id, year=year).all()
+    }
+    entitlements = entitlements_for(employee_id)
+
+    balances = []
+    for absence_type in sorted(set(taken) | set(entitlements)):
+        entitled = entitlements.get(absence_type)
+        days_taken = round(taken.get(absence_type, 0), 2)
+        balances.append({
+            'type': absence_type,
+            'entitled': entitled,
+            'taken': days_taken,
+            'remaining': round(entitled - days_taken, 2) if entitled is not None else None
+        })
+    return balances
+
+def rebuild_leave_ledger(batch_size=1000):
+    """
+    Rebuilds the ledger and balances from the approved absences. Used to
+    backfill existing databases and as a maintenance operation.
+    """
+    db.session.execute(delete(LeaveLedgerEntry))
+    db.session.execute(delete(LeaveBalance))
+
+    posted = 0
+    last_id = ''
+    while True:
+        batch = Absence.query.filter(
+            Absence.status == 'approved',
+            Absence.id > last_id
+        ).order_by(Absence.id).limit(batch_size).all()
+        if not batch:
+            break
+
+        sync_absence_ledger(batch)
+        db.session.commit()
+
+        posted += len(batch)
+        last_id = batch[-1].id
+
+    db.session.commit()
+    return posted
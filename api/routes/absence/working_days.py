@@ -0,0 +1,117 @@
+from flask import g
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Holiday, HolidayCalendarVersion
+import datetime
+import threading
+
+class WorkingDayCalendar:
+    """
+    Counts working days (Monday to Friday, minus holidays) in O(1).
+
+    For each year a cumulative array holds the number of working days before
+    each day of the year, so any range is a subtraction. Arrays are built on
+    first use from the holidays table and tagged with the holiday calendar
+    version they were built at. Every holiday change bumps that version in the
+    database, so any process rebuilds its stale years on their next use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._years = {}  # year -> (calendar version, cumulative counts)
+
+    @staticmethod
+    def current_version():
+        """
+        The holiday calendar version, read once per app context (request)
+        """
+        if 'holiday_calendar_version' not in g:
+            g.holiday_calendar_version = db.session.execute(
+                select(HolidayCalendarVersion.version).where(HolidayCalendarVersion.id == 1)
+            ).scalar() or 0
+        return g.holiday_calendar_version
+
+    def _build_year(self, year):
+        first_day = datetime.date(year, 1, 1)
+        last_day = datetime.date(year, 12, 31)
+        holidays = set(db.session.execute(
+            db.select(Holiday.date).where(Holiday.date >= first_day, Holiday.date <= last_day)
+        ).scalars())
+
+        # cumulative[i] = working days among the first i days of the year
+        cumulative = [0]
+        day = first_day
+        while day <= last_day:
+            is_working_day = day.weekday() < 5 and day not in holidays
+            cumulative.append(cumulative[-1] + (1 if is_working_day else 0))
+            day += datetime.timedelta(days=1)
+        return cumulative
+
+    def _cumulative(self, year):
+        version = self.current_version()
+        cached = self._years.get(year)
+        if cached and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            cached = self._years.get(year)
+            if not cached or cached[0] != version:
+                cached = (version, self._build_year(year))
+                self._years[year] = cached
+        return cached[1]
+
+    def invalidate(self, year=None):
+        g.pop('holiday_calendar_version', None)
+        with self._lock:
+            if year is None:
+                self._years.clear()
+            else:
+                self._years.pop(year, None)
+
+    def working_days(self, start, end):
+        """
+        Working days in [start, end], both inclusive
+        """
+        if start > end:
+            return 0
+
+        total = 0
+        current = start
+        while current <= end:
+            year_end = min(end, datetime.date(current.year, 12, 31))
+            cumulative = self._cumulative(current.year)
+            first = current.timetuple().tm_yday - 1
+            last = year_end.timetuple().tm_yday
+            total += cumulative[last] - cumulative[first]
+            current = year_end + datetime.timedelta(days=1)
+        return total
+
+    def working_days_by_year(self, start, end):
+        """
+        Working days in [start, end] split by calendar year
+        """
+        days = {}
+        current = start
+        while current <= end:
+            year_end = min(end, datetime.date(current.year, 12, 31))
+            days[current.year] = self.working_days(current, year_end)
+            current = year_end + datetime.timedelta(days=1)
+        return days
+
+def bump_holiday_calendar_version():
+    """
+    Marks every process's cached calendar stale. Call in the same transaction
+    as the holiday change.
+    """
+    bump = update(HolidayCalendarVersion).where(
+        HolidayCalendarVersion.id == 1
+    ).values(version=HolidayCalendarVersion.version + 1)
+    if not db.session.execute(bump).rowcount:
+        try:
+            # First holiday change ever, create the row unless another worker just did
+            with db.session.begin_nested():
+                db.session.add(HolidayCalendarVersion(id=1, version=1))
+        except IntegrityError:
+            db.session.execute(bump)
+    working_day_calendar.invalidate()
+
+working_day_calendar = WorkingDayCalendar()
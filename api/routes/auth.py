@@ -5,6 +5,9 @@ from flask import Blueprint, request, jsonify
 import uuid
 from werkzeug.security import generate_password_hash, check_password_hash
 from models import db, Employee, TimeClock
+from .org_hierarchy import add_to_hierarchy
+from .employee_search import index_employees
+from .employee_suggest import employee_prefix_index
 import jwt
 import datetime
 import os
@@ -94,7 +97,11 @@ def register():
     
     try:
         db.session.add(new_user)
+        db.session.flush()
+        index_employees([new_user])
+        add_to_hierarchy([new_user])
         db.session.commit()
+        employee_prefix_index.upsert(new_user)
         
         token = jwt.encode({
             'user_id': new_user.id,
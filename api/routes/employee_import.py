@@ -0,0 +1,208 @@
+import csv
+import io
+import json
+import time
+import uuid
+from sqlalchemy import select, insert
+from models import db, Employee
+from schemas import EmployeeSchema
+from .employee_search import index_employees
+from .employee_suggest import employee_prefix_index
+from .org_hierarchy import add_to_hierarchy
+
+employee_schema = EmployeeSchema()
+
+# Rows inserted per executemany round trip
+IMPORT_BATCH_SIZE = 500
+
+# Cap on the number of row errors echoed back to the client
+IMPORT_MAX_ERRORS = 1000
+
+REQUIRED_FIELDS = ['name', 'email', 'position', 'department']
+
+def iter_ndjson_rows(text_stream):
+    """
+    Yields (line_number, row) for each non-blank line of an NDJSON stream.
+    Lines that are not JSON objects are yielded with an error string instead.
+    """
+    for line_number, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, 'Each line must be a JSON object'
+            continue
+        yield line_number, row
+
+def iter_csv_rows(text_stream):
+    """
+    Yields (line_number, row) for each CSV record, using the header row as field
+    names. Empty cells are treated as missing values.
+    """
+    reader = csv.DictReader(text_stream)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+
+class ImportDecodeError(ValueError):
+    """
+    Raised at the first line of an import stream that is not valid UTF-8
+    """
+
+    def __init__(self, line_number, error):
+        super().__init__(f'Import must be UTF-8 encoded: {error}')
+        self.line_number = line_number
+
+def decode_lines(raw_stream):
+    """
+    Yields the lines of a byte stream decoded as UTF-8. Lines are decoded one
+    at a time so an invalid byte is pinned on its line, and line endings are
+    kept for the CSV reader.
+    """
+    for line_number, line in enumerate(io.BufferedReader(raw_stream), start=1):
+        try:
+            yield line.decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise ImportDecodeError(line_number, e)
+
+def open_import_stream(raw_stream, import_format):
+    text_stream = decode_lines(raw_stream)
+    if import_format == 'csv':
+        return iter_csv_rows(text_stream)
+    return iter_ndjson_rows(text_stream)
+
+def validate_import_row(row):
+    """
+    Returns (employee_values, error) for one imported row
+    """
+    try:
+        data = employee_schema.load(row)
+    except Exception as e:
+        return None, str(e)
+
+    missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+    if missing:
+        return None, f'Missing required fields: {", ".join(missing)}'
+
+    return {
+        'id': str(uuid.uuid4()),
+        'name': data['name'],
+        'position': data['position'],
+        'department': data['department'],
+        'email': data['email'],
+        'phone': data.get('phone'),
+        'status': data.get('status', 'active'),
+        'image_url': data.get('image_url'),
+        'hire_date': data.get('hire_date'),
+        'manager_id': data.get('manager_id'),
+        'role': data.get('role', 'employee')
+    }, None
+
+class EmployeeImport:
+    """
+    Validates streamed rows and inserts them in batches. A failing row is
+    reported with its line number and never aborts the rest of the file; a
+    line that is not valid UTF-8 is reported and ends the import, keeping the
+    rows read before it.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.batch = []  # (line_number, employee_values)
+        self.seen_emails = set()
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line_number, error):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'line': line_number, 'error': error})
+
+    def add_row(self, line_number, row):
+        if isinstance(row, str):
+            self.add_error(line_number, row)
+            return
+
+        values, error = validate_import_row(row)
+        if error:
+            self.add_error(line_number, error)
+            return
+
+        email_key = values['email'].lower()
+        if email_key in self.seen_emails:
+            self.add_error(line_number, f'Duplicate email in file: {values["email"]}')
+            return
+        self.seen_emails.add(email_key)
+
+        self.batch.append((line_number, values))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+
+        # One lookup per batch for emails that already exist (the column collation is case-insensitive)
+        existing = {
+            email.lower() for email in db.session.execute(
+                select(Employee.email).where(Employee.email.in_([values['email'] for _, values in batch]))
+            ).scalars()
+        }
+        rows = []
+        for line_number, values in batch:
+            if values['email'].lower() in existing:
+                self.add_error(line_number, f'Employee with email {values["email"]} already exists')
+            else:
+                rows.append((line_number, values))
+
+        if not rows:
+            return
+
+        try:
+            self.insert_rows([values for _, values in rows])
+            self.inserted += len(rows)
+        except Exception:
+            db.session.rollback()
+            # Retry the batch row by row to pin the error on the offending lines
+            for line_number, values in rows:
+                try:
+                    self.insert_rows([values])
+                    self.inserted += 1
+                except Exception as e:
+                    db.session.rollback()
+                    self.add_error(line_number, str(getattr(e, 'orig', e)))
+
+    def insert_rows(self, rows):
+        db.session.execute(insert(Employee), rows)
+        index_employees(rows)
+        add_to_hierarchy(rows)
+        db.session.commit()
+
+    def run(self, rows):
+        started = time.perf_counter()
+        try:
+            for line_number, row in rows:
+                self.add_row(line_number, row)
+        except ImportDecodeError as e:
+            # Nothing after an undecodable line can be trusted, stop reading there
+            self.add_error(e.line_number, str(e))
+        self.flush()
+        elapsed = time.perf_counter() - started
+
+        if self.inserted:
+            employee_prefix_index.invalidate()
+
+        return {
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'errorsTruncated': self.failed > len(self.errors),
+            'elapsedSeconds': round(elapsed, 3),
+            'rowsPerSecond': round((self.inserted + self.failed) / elapsed, 1) if elapsed else None
+        }
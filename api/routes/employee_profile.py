@@ -0,0 +1,77 @@
+from models import Absence, PerformanceReview, PerformanceGoal, SkillAssessment, TimeClock
+from schemas import (
+    AbsenceSchema, PerformanceReviewSchema, PerformanceGoalSchema, SkillAssessmentSchema, TimeClockSchema
+)
+from .absence.absence_utils import add_working_days
+
+absence_schema = AbsenceSchema()
+reviews_schema = PerformanceReviewSchema(many=True)
+goals_schema = PerformanceGoalSchema(many=True)
+skills_schema = SkillAssessmentSchema(many=True)
+time_clock_schema = TimeClockSchema()
+time_clock_entries_schema = TimeClockSchema(many=True)
+
+# Most recent items returned for the history relations
+PROFILE_HISTORY_LIMIT = 20
+
+def load_absences(employee, limit):
+    absences = employee.absences.order_by(Absence.start_date.desc()).limit(limit).all()
+    return [add_working_days(absence_schema.dump(absence), absence) for absence in absences]
+
+def load_performance_reviews(employee, limit):
+    return reviews_schema.dump(
+        employee.performance_reviews.order_by(PerformanceReview.review_date.desc()).limit(limit).all()
+    )
+
+def load_time_clock_entries(employee, limit):
+    return time_clock_entries_schema.dump(
+        employee.time_clock_entries.order_by(TimeClock.clock_in_at.desc()).limit(limit).all()
+    )
+
+def load_active_time_clock_entry(employee, limit):
+    entry = employee.time_clock_entries.filter(TimeClock.status == 'active').first()
+    return time_clock_schema.dump(entry) if entry else None
+
+def load_goals(employee, limit):
+    return goals_schema.dump(
+        PerformanceGoal.query.filter(PerformanceGoal.employee_id == employee.id).order_by(PerformanceGoal.due_date).limit(limit).all()
+    )
+
+def load_skills(employee, limit):
+    return skills_schema.dump(
+        SkillAssessment.query.filter(SkillAssessment.employee_id == employee.id).order_by(SkillAssessment.name).limit(limit).all()
+    )
+
+# include= option -> (response key, loader). Each loader is one query.
+PROFILE_RELATIONS = {
+    'absences': ('absences', load_absences),
+    'performance_reviews': ('performanceReviews', load_performance_reviews),
+    'time_clock_entries': ('timeClockEntries', load_time_clock_entries),
+    'active_time_clock': ('activeTimeClockEntry', load_active_time_clock_entry),
+    'goals': ('goals', load_goals),
+    'skills': ('skills', load_skills)
+}
+
+def parse_profile_include(value):
+    """
+    Parses a comma separated include argument, defaulting to every relation.
+    Raises ValueError for unknown relations.
+    """
+    if not value:
+        return list(PROFILE_RELATIONS)
+    include = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in include if name not in PROFILE_RELATIONS]
+    if unknown:
+        raise ValueError(f'Invalid include: {", ".join(unknown)}. Must be among {", ".join(PROFILE_RELATIONS)}')
+    return include
+
+def employee_profile_relations(employee, include, limit=PROFILE_HISTORY_LIMIT):
+    """
+    Loads the requested relations of an employee, one query each, within the
+    same request and database connection
+    """
+    relations = {}
+    for name in include:
+        key, loader = PROFILE_RELATIONS[name]
+        relations[key] = loader(employee, limit)
+    return relations
@@ -0,0 +1,178 @@
+import re
+import unicodedata
+from sqlalchemy import or_, select, delete, insert, func, case
+from models import db, Employee, EmployeeSearchToken
+
+# Fields covered by the search index and how much a match in each one counts for ranking
+SEARCH_FIELD_WEIGHTS = {
+    'name': 3,
+    'position': 2,
+    'email': 1
+}
+
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+def normalize_words(text):
+    """
+    Splits text into lowercase words with accents removed
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return WORD_PATTERN.findall(text.lower())
+
+def word_trigrams(word):
+    """
+    Returns the trigrams of a word padded like pg_trgm ('  w', ' wo', ..., 'rd '),
+    so that word starts and ends get their own tokens
+    """
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def document_trigrams(text):
+    trigrams = set()
+    for word in normalize_words(text):
+        trigrams |= word_trigrams(word)
+    return trigrams
+
+def query_trigrams(term):
+    """
+    Returns (required, boost) trigram sets for a search term.
+
+    Every required trigram must be present in a field for it to be a candidate.
+    Only words of three or more characters have trigrams that are guaranteed to
+    appear wherever the word occurs, so shorter words only boost the score and
+    are left to the ILIKE recheck. Boost trigrams only add to the score, so
+    matches on word boundaries rank higher.
+    """
+    required = set()
+    boost = set()
+    for word in normalize_words(term):
+        if len(word) >= 3:
+            required |= {word[i:i + 3] for i in range(len(word) - 2)}
+            boost |= {f' {word[:2]}', f'{word[-2:]} '}
+        else:
+            boost |= word_trigrams(word)
+    return required, boost - required
+
+def employee_token_rows(employee_id, name, email, position):
+    values = {'name': name, 'email': email, 'position': position}
+    rows = []
+    for field, weight in SEARCH_FIELD_WEIGHTS.items():
+        for token in document_trigrams(values[field]):
+            rows.append({
+                'employee_id': employee_id,
+                'field': field,
+                'token': token,
+                'weight': weight
+            })
+    return rows
+
+def index_employees(employees):
+    """
+    Adds search tokens for the given employees to the current transaction.
+    Accepts Employee objects or dicts with id, name, email and position.
+    """
+    rows = []
+    for employee in employees:
+        if isinstance(employee, dict):
+            rows.extend(employee_token_rows(employee['id'], employee.get('name'), employee.get('email'), employee.get('position')))
+        else:
+            rows.extend(employee_token_rows(employee.id, employee.name, employee.email, employee.position))
+
+    if rows:
+        db.session.execute(insert(EmployeeSearchToken), rows)
+
+def unindex_employees(employee_ids):
+    """
+    Removes the search tokens of the given employees in the current transaction
+    """
+    if employee_ids:
+        db.session.execute(
+            delete(EmployeeSearchToken).where(EmployeeSearchToken.employee_id.in_(employee_ids))
+        )
+
+def reindex_employees(employees):
+    employees = list(employees)
+    unindex_employees([e['id'] if isinstance(e, dict) else e.id for e in employees])
+    index_employees(employees)
+
+def rebuild_search_index(batch_size=1000):
+    """
+    Rebuilds the whole employee search index. Used to backfill existing
+    databases and as a maintenance operation.
+    """
+    db.session.execute(delete(EmployeeSearchToken))
+
+    indexed = 0
+    last_id = ''
+    while True:
+        batch = db.session.execute(
+            select(Employee.id, Employee.name, Employee.email, Employee.position)
+            .where(Employee.id > last_id)
+            .order_by(Employee.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+
+        index_employees([row._asdict() for row in batch])
+        db.session.commit()
+
+        indexed += len(batch)
+        last_id = batch[-1].id
+
+    db.session.commit()
+    return indexed
+
+def search_matches(term):
+    """
+    Returns a subquery of (employee_id, score) for the employees whose indexed
+    name, email or position contain every required trigram of the term, or None
+    if the term has no word of three or more characters.
+    """
+    required, boost = query_trigrams(term)
+    if not required:
+        return None
+
+    token = EmployeeSearchToken.token
+    per_field = (
+        select(
+            EmployeeSearchToken.employee_id,
+            func.sum(EmployeeSearchToken.weight).label('score')
+        )
+        .where(token.in_(required | boost))
+        .group_by(EmployeeSearchToken.employee_id, EmployeeSearchToken.field)
+        .having(func.sum(case((token.in_(required), 1), else_=0)) == len(required))
+        .subquery()
+    )
+
+    return (
+        select(per_field.c.employee_id, func.max(per_field.c.score).label('score'))
+        .group_by(per_field.c.employee_id)
+        .subquery('search_matches')
+    )
+
+def ilike_search_filter(term):
+    return or_(
+        Employee.name.ilike(f'%{term}%'),
+        Employee.email.ilike(f'%{term}%'),
+        Employee.position.ilike(f'%{term}%')
+    )
+
+def apply_employee_search(query, term):
+    """
+    Restricts an Employee query to the search term.
+
+    Candidates come from the trigram index; the original ILIKE condition is
+    kept as a recheck, so it only runs on the candidate rows instead of the
+    whole table. Terms too short for the index (e.g. "ar" inside "Mark") fall
+    back to the plain ILIKE scan. Returns (query, matches) where matches
+    exposes the ranking score, or is None when the term could not use the index.
+    """
+    matches = search_matches(term)
+    if matches is not None:
+        query = query.join(matches, matches.c.employee_id == Employee.id)
+
+    return query.filter(ilike_search_filter(term)), matches
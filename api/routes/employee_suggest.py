@@ -0,0 +1,128 @@
+import bisect
+import os
+import threading
+import time
+from sqlalchemy import select
+from models import db, Employee
+from .employee_search import normalize_words
+
+# Columns returned by the typeahead endpoint
+SUGGEST_COLUMNS = ['id', 'name', 'email', 'position', 'department', 'image_url']
+
+class EmployeePrefixIndex:
+    """
+    Per-process sorted index of name and email prefixes used by
+    GET /api/employees/suggest.
+
+    The index is built lazily from the employees table on first use and kept
+    fresh by the employee write routes of this process. Writes made by other
+    worker processes are picked up when the index is rebuilt after max_age
+    seconds.
+    """
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._keys = []  # Sorted (key, employee_id) pairs
+        self._entries = {}  # employee_id -> suggestion dict
+        self._built_at = None
+
+    @staticmethod
+    def _keys_for(entry):
+        words = normalize_words(entry['name'])
+        keys = set()
+        if words:
+            # The full name answers "john sm", each later word answers "smi"
+            keys.add(' '.join(words))
+            keys.update(words[1:])
+        if entry['email']:
+            keys.add(entry['email'].lower())
+        return keys
+
+    def _build(self):
+        rows = db.session.execute(
+            select(*[getattr(Employee, column) for column in SUGGEST_COLUMNS])
+        ).all()
+
+        entries = {}
+        keys = []
+        for row in rows:
+            entry = row._asdict()
+            entries[entry['id']] = entry
+            keys.extend((key, entry['id']) for key in self._keys_for(entry))
+        keys.sort()
+
+        self._entries = entries
+        self._keys = keys
+        self._built_at = time.monotonic()
+
+    def _is_fresh(self):
+        return self._built_at is not None and time.monotonic() - self._built_at < self.max_age
+
+    def ensure_built(self):
+        if self._is_fresh():
+            return
+        with self._lock:
+            if not self._is_fresh():
+                self._build()
+
+    def _remove_locked(self, employee_id):
+        entry = self._entries.pop(employee_id, None)
+        if not entry:
+            return
+        for key in self._keys_for(entry):
+            position = bisect.bisect_left(self._keys, (key, employee_id))
+            if position < len(self._keys) and self._keys[position] == (key, employee_id):
+                del self._keys[position]
+
+    def invalidate(self):
+        """
+        Forces a rebuild on next use, for writes that touch many employees
+        """
+        self._built_at = None
+
+    def upsert(self, employee):
+        """
+        Adds or refreshes an employee. Does nothing until the index is built.
+        """
+        if self._built_at is None:
+            return
+        entry = {column: getattr(employee, column) for column in SUGGEST_COLUMNS}
+        with self._lock:
+            self._remove_locked(entry['id'])
+            self._entries[entry['id']] = entry
+            for key in self._keys_for(entry):
+                bisect.insort(self._keys, (key, entry['id']))
+
+    def remove(self, employee_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove_locked(employee_id)
+
+    def suggest(self, query, limit):
+        self.ensure_built()
+
+        # Names are matched on normalized words, emails on the raw lowercase text
+        prefixes = {' '.join(normalize_words(query)), query.strip().lower()}
+        prefixes.discard('')
+
+        matches = []
+        seen = set()
+        with self._lock:
+            keys = self._keys
+            for prefix in sorted(prefixes):
+                position = bisect.bisect_left(keys, (prefix,))
+                while len(matches) < limit and position < len(keys) and keys[position][0].startswith(prefix):
+                    employee_id = keys[position][1]
+                    if employee_id not in seen:
+                        seen.add(employee_id)
+                        matches.append(dict(self._entries[employee_id]))
+                    position += 1
+
+        matches.sort(key=lambda entry: entry['name'].lower())
+        return matches
+
+employee_prefix_index = EmployeePrefixIndex(
+    max_age=int(os.getenv('SUGGEST_INDEX_MAX_AGE', '300'))
+)
@@ -0,0 +1,84 @@
+import datetime
+from sqlalchemy import select, func
+from models import db, Employee, Absence, TimeClock, PerformanceReview
+from .org_hierarchy import reports_subquery
+
+def team_snapshot(manager_id, depth=1):
+    """
+    Reports of a manager down to `depth` levels, each with their active clock
+    entry, today's approved absence and latest review score.
+
+    Runs four queries whatever the team size, each joining the same reports
+    subquery instead of one lookup per report.
+    """
+    today = datetime.date.today()
+    reports = reports_subquery(manager_id, max_depth=depth)
+
+    members = db.session.query(Employee, reports.c.depth).join(
+        reports, Employee.id == reports.c.id
+    ).order_by(reports.c.depth, Employee.name).all()
+    if not members:
+        return []
+
+    active_entries = {}
+    for entry in TimeClock.query.join(
+        reports, TimeClock.employee_id == reports.c.id
+    ).filter(TimeClock.status == 'active').order_by(TimeClock.clock_in_at):
+        active_entries[entry.employee_id] = entry
+
+    absences = {}
+    for absence in Absence.query.join(
+        reports, Absence.employee_id == reports.c.id
+    ).filter(
+        Absence.status == 'approved',
+        Absence.start_date <= today,
+        Absence.end_date >= today
+    ).order_by(Absence.start_date):
+        absences[absence.employee_id] = absence
+
+    latest_dates = select(
+        PerformanceReview.employee_id, func.max(PerformanceReview.review_date).label('review_date')
+    ).join(
+        reports, PerformanceReview.employee_id == reports.c.id
+    ).group_by(PerformanceReview.employee_id).subquery()
+    reviews = {}
+    for review in PerformanceReview.query.join(
+        latest_dates,
+        (PerformanceReview.employee_id == latest_dates.c.employee_id)
+        & (PerformanceReview.review_date == latest_dates.c.review_date)
+    ):
+        reviews[review.employee_id] = review
+
+    team = []
+    for employee, member_depth in members:
+        entry = active_entries.get(employee.id)
+        absence = absences.get(employee.id)
+        review = reviews.get(employee.id)
+        team.append({
+            'id': employee.id,
+            'name': employee.name,
+            'position': employee.position,
+            'department': employee.department,
+            'status': employee.status,
+            'imageUrl': employee.image_url,
+            'managerId': employee.manager_id,
+            'depth': member_depth,
+            'clockedIn': entry is not None,
+            'activeEntry': {
+                'id': entry.id,
+                'date': entry.date,
+                'clockInTime': entry.clock_in_time
+            } if entry else None,
+            'absenceToday': {
+                'id': absence.id,
+                'type': absence.type,
+                'startDate': absence.start_date.isoformat(),
+                'endDate': absence.end_date.isoformat()
+            } if absence else None,
+            'lastReview': {
+                'id': review.id,
+                'reviewDate': review.review_date.isoformat(),
+                'overallScore': review.overall_score
+            } if review else None
+        })
+    return team
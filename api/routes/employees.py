@@ -1,19 +1,34 @@
 
 from flask import Blueprint, request, jsonify
 import uuid
-from sqlalchemy import or_
+import datetime
+from sqlalchemy import select, update
 from models import db, Employee
 from schemas import EmployeeSchema
+from .pagination import keyset_paginate, clamp_page_size
+from .employee_search import apply_employee_search, index_employees, reindex_employees, unindex_employees
+from .employee_suggest import employee_prefix_index, SUGGEST_COLUMNS
+from .employee_import import EmployeeImport, open_import_stream
+from .org_hierarchy import add_to_hierarchy, set_manager, remove_from_hierarchy, MAX_HIERARCHY_DEPTH
+from .employee_team import team_snapshot
+from .employee_profile import parse_profile_include, employee_profile_relations, PROFILE_HISTORY_LIMIT
+from .absence.leave_utils import leave_balance
 
 employees_bp = Blueprint('employees', __name__)
 employee_schema = EmployeeSchema()
 employees_schema = EmployeeSchema(many=True)
 
+# Columns that can be used as the sort key in cursor pagination mode
+CURSOR_SORT_COLUMNS = ['name', 'email', 'position', 'department', 'status', 'hire_date']
+
+# Maximum number of typeahead suggestions per request
+SUGGEST_MAX_LIMIT = 25
+
 @employees_bp.route('', methods=['GET'])
 def get_employees():
     # Get query parameters for filtering and pagination
     page = request.args.get('page', 1, type=int)
-    page_size = request.args.get('pageSize', 10, type=int)
+    page_size = clamp_page_size(request.args.get('pageSize', 10, type=int))
     search = request.args.get('search', '')
     department = request.args.get('department', '')
     status = request.args.get('status', '')
@@ -24,12 +39,9 @@ def get_employees():
     query = Employee.query
     
     # Apply filters
+    search_matches = None
     if search:
-        query = query.filter(or_(
-            Employee.name.ilike(f'%{search}%'),
-            Employee.email.ilike(f'%{search}%'),
-            Employee.position.ilike(f'%{search}%')
-        ))
+        query, search_matches = apply_employee_search(query, search)
     
     if department:
         query = query.filter(Employee.department == department)
@@ -37,8 +49,37 @@ def get_employees():
     if status:
         query = query.filter(Employee.status == status)
     
+    # Cursor mode (opt-in with ?cursor=, empty for the first page) seeks past the
+    # last row instead of using OFFSET and skips the COUNT query
+    if 'cursor' in request.args:
+        if sort_by not in CURSOR_SORT_COLUMNS:
+            return jsonify({'error': f'Invalid sortBy. Must be one of {", ".join(CURSOR_SORT_COLUMNS)}'}), 400
+        
+        try:
+            employees, next_cursor = keyset_paginate(
+                query,
+                getattr(Employee, sort_by),
+                Employee.id,
+                sort_direction == 'desc',
+                page_size,
+                request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'data': employees_schema.dump(employees),
+            'nextCursor': next_cursor,
+            'pageSize': page_size
+        })
+    
     # Apply sorting
-    if sort_direction == 'asc':
+    if sort_by == 'relevance':
+        if search_matches is not None:
+            query = query.order_by(search_matches.c.score.desc(), Employee.name)
+        else:
+            query = query.order_by(Employee.name)
+    elif sort_direction == 'asc':
         query = query.order_by(getattr(Employee, sort_by))
     else:
         query = query.order_by(getattr(Employee, sort_by).desc())
@@ -59,11 +100,65 @@ def get_employees():
     
     return jsonify(result)
 
+@employees_bp.route('/suggest', methods=['GET'])
+def suggest_employees():
+    # Typeahead for people pickers, answered from the in-memory prefix index
+    q = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), SUGGEST_MAX_LIMIT)
+    
+    if not q.strip():
+        return jsonify({'data': []})
+    
+    return jsonify({'data': employee_prefix_index.suggest(q, limit)})
+
 @employees_bp.route('/<id>', methods=['GET'])
 def get_employee(id):
     employee = Employee.query.get_or_404(id)
     return jsonify({'data': employee_schema.dump(employee)})
 
+@employees_bp.route('/<id>/leave-balance', methods=['GET'])
+def get_leave_balance(id):
+    # Materialized leave balances per absence type for one year
+    year = request.args.get('year', datetime.date.today().year, type=int)
+    
+    if not db.session.query(Employee.id).filter(Employee.id == id).first():
+        return jsonify({'error': 'Employee not found'}), 404
+    
+    return jsonify({'data': {
+        'employeeId': id,
+        'year': year,
+        'balances': leave_balance(id, year)
+    }})
+
+@employees_bp.route('/<id>/profile', methods=['GET'])
+def get_employee_profile(id):
+    # The employee with the selected relations in one response
+    try:
+        include = parse_profile_include(request.args.get('include', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    limit = min(max(request.args.get('limit', PROFILE_HISTORY_LIMIT, type=int), 1), 100)
+    employee = Employee.query.get_or_404(id)
+    
+    result = employee_schema.dump(employee)
+    result.update(employee_profile_relations(employee, include, limit))
+    return jsonify({'data': result})
+
+@employees_bp.route('/<id>/team', methods=['GET'])
+def get_team(id):
+    # Reports with their clock status, today's absence and latest review score
+    depth = min(max(request.args.get('depth', 1, type=int), 1), MAX_HIERARCHY_DEPTH)
+    
+    if not db.session.query(Employee.id).filter(Employee.id == id).first():
+        return jsonify({'error': 'Employee not found'}), 404
+    
+    return jsonify({'data': {
+        'managerId': id,
+        'depth': depth,
+        'members': team_snapshot(id, depth)
+    }})
+
 @employees_bp.route('', methods=['POST'])
 def create_employee():
     # Validate and deserialize input
@@ -92,12 +187,107 @@ def create_employee():
     db.session.add(new_employee)
     
     try:
+        db.session.flush()
+        index_employees([new_employee])
+        add_to_hierarchy([new_employee])
         db.session.commit()
+        employee_prefix_index.upsert(new_employee)
         return jsonify({'data': employee_schema.dump(new_employee)}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@employees_bp.route('/bulk', methods=['POST'])
+def bulk_import_employees():
+    # Streamed import: NDJSON (one employee per line) or CSV with a header row
+    import_format = request.args.get('format')
+    if not import_format:
+        import_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    
+    if import_format not in ['ndjson', 'csv']:
+        return jsonify({'error': 'Invalid format. Must be one of ndjson, csv'}), 400
+    
+    result = EmployeeImport().run(open_import_stream(request.stream, import_format))
+    return jsonify({'data': result})
+
+@employees_bp.route('/bulk', methods=['PATCH'])
+def bulk_update_employees():
+    # Apply many partial updates (e.g. a reorg) in one transaction
+    json_data = request.get_json()
+    updates = json_data.get('updates') if isinstance(json_data, dict) else None
+    if not isinstance(updates, list) or not updates:
+        return jsonify({'error': 'A non-empty list of updates is required'}), 400
+    
+    # Validate everything up front, merging repeated ids in order
+    changes_by_id = {}
+    errors = []
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict) or not item.get('id'):
+            errors.append({'index': index, 'error': 'Employee ID is required'})
+            continue
+        
+        try:
+            data = employee_schema.load({k: v for k, v in item.items() if k != 'id'}, partial=True)
+        except Exception as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        
+        changes_by_id.setdefault(item['id'], {}).update(data)
+    
+    if errors:
+        return jsonify({'error': 'Invalid updates', 'details': errors}), 400
+    
+    ids = list(changes_by_id)
+    existing_ids = set(db.session.execute(
+        select(Employee.id).where(Employee.id.in_(ids))
+    ).scalars())
+    missing_ids = [employee_id for employee_id in ids if employee_id not in existing_ids]
+    
+    # Employees receiving identical changes share one UPDATE ... WHERE id IN (...)
+    groups = {}
+    for employee_id, changes in changes_by_id.items():
+        if employee_id in existing_ids and changes:
+            groups.setdefault(tuple(sorted(changes.items())), []).append(employee_id)
+    
+    changed_fields = set()
+    updated = 0
+    try:
+        for changes, group_ids in groups.items():
+            updated += db.session.execute(
+                update(Employee).where(Employee.id.in_(group_ids)).values(dict(changes))
+            ).rowcount
+            changed_fields.update(field for field, _ in changes)
+        
+        # Move reorganized employees in the org hierarchy, in request order
+        for employee_id, changes in changes_by_id.items():
+            if employee_id in existing_ids and 'manager_id' in changes:
+                set_manager(employee_id, changes['manager_id'])
+        
+        # Keep the search index in step with the searchable fields
+        reindex_ids = [
+            employee_id for employee_id, changes in changes_by_id.items()
+            if employee_id in existing_ids and changes.keys() & {'name', 'email', 'position'}
+        ]
+        if reindex_ids:
+            reindexed = db.session.execute(
+                select(Employee.id, Employee.name, Employee.email, Employee.position)
+                .where(Employee.id.in_(reindex_ids))
+            ).all()
+            reindex_employees([row._asdict() for row in reindexed])
+        
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    if changed_fields & set(SUGGEST_COLUMNS):
+        employee_prefix_index.invalidate()
+    
+    return jsonify({'data': {'updated': updated, 'missingIds': missing_ids}})
+
 @employees_bp.route('/<id>', methods=['PUT'])
 def update_employee(id):
     employee = Employee.query.get_or_404(id)
@@ -110,13 +300,24 @@ def update_employee(id):
     except Exception as e:
         return jsonify({'error': str(e)}), 400
     
+    manager_changed = 'manager_id' in data and data['manager_id'] != employee.manager_id
+    
     # Update employee fields
     for key, value in data.items():
         setattr(employee, key, value)
     
     try:
+        if manager_changed:
+            set_manager(employee.id, employee.manager_id)
+        # Keep the search index in step with the searchable fields
+        if any(field in data for field in ('name', 'email', 'position')):
+            reindex_employees([employee])
         db.session.commit()
+        employee_prefix_index.upsert(employee)
         return jsonify({'data': employee_schema.dump(employee)})
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -126,8 +327,11 @@ def delete_employee(id):
     employee = Employee.query.get_or_404(id)
     
     try:
+        unindex_employees([employee.id])
+        remove_from_hierarchy([employee.id])
         db.session.delete(employee)
         db.session.commit()
+        employee_prefix_index.remove(id)
         return jsonify({'data': {'message': f'Employee {id} deleted successfully'}}), 200
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func
+from models import db, Employee, OrgClosure
+
+org_bp = Blueprint('org', __name__)
+
+def org_member_to_dict(employee, depth):
+    return {
+        'id': employee.id,
+        'name': employee.name,
+        'position': employee.position,
+        'department': employee.department,
+        'status': employee.status,
+        'imageUrl': employee.image_url,
+        'managerId': employee.manager_id,
+        'depth': depth
+    }
+
+@org_bp.route('/<id>/subtree', methods=['GET'])
+def get_subtree(id):
+    # The employee and everyone below them, in one query on the closure table.
+    # Each member carries managerId so the client can assemble the chart.
+    Employee.query.get_or_404(id)
+    max_depth = request.args.get('maxDepth', type=int)
+    
+    query = db.session.query(Employee, OrgClosure.depth).join(
+        OrgClosure, OrgClosure.descendant_id == Employee.id
+    ).filter(OrgClosure.ancestor_id == id)
+    if max_depth is not None:
+        query = query.filter(OrgClosure.depth <= max_depth)
+    
+    rows = query.order_by(OrgClosure.depth, Employee.name).all()
+    return jsonify({'data': [org_member_to_dict(employee, depth) for employee, depth in rows]})
+
+@org_bp.route('/<id>/chain', methods=['GET'])
+def get_chain_of_command(id):
+    # Managers above the employee, from the direct manager up to the top
+    Employee.query.get_or_404(id)
+    
+    rows = db.session.query(Employee, OrgClosure.depth).join(
+        OrgClosure, OrgClosure.ancestor_id == Employee.id
+    ).filter(
+        OrgClosure.descendant_id == id,
+        OrgClosure.depth >= 1
+    ).order_by(OrgClosure.depth).all()
+    
+    return jsonify({'data': [org_member_to_dict(employee, depth) for employee, depth in rows]})
+
+@org_bp.route('/<id>/span', methods=['GET'])
+def get_span_of_control(id):
+    # Direct and total reports, with the headcount at each level below the employee
+    Employee.query.get_or_404(id)
+    
+    levels = db.session.query(OrgClosure.depth, func.count()).filter(
+        OrgClosure.ancestor_id == id,
+        OrgClosure.depth >= 1
+    ).group_by(OrgClosure.depth).order_by(OrgClosure.depth).all()
+    
+    return jsonify({'data': {
+        'employeeId': id,
+        'directReports': next((count for depth, count in levels if depth == 1), 0),
+        'totalReports': sum(count for _, count in levels),
+        'levels': len(levels),
+        'byDepth': [{'depth': depth, 'count': count} for depth, count in levels]
+    }})
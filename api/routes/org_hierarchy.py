@@ -0,0 +1,152 @@
+from sqlalchemy import select, delete, insert
+from models import db, Employee, OrgClosure
+
+# Guards the hierarchy walks against manager_id cycles
+MAX_HIERARCHY_DEPTH = 32
+
+INSERT_BATCH_SIZE = 5000
+
+def _insert_closure_rows(rows):
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.session.execute(insert(OrgClosure), rows[start:start + INSERT_BATCH_SIZE])
+
+def ancestors_of(employee_ids):
+    """
+    Returns {employee_id: [(ancestor_id, depth), ...]} including the employee
+    itself at depth 0, in one query
+    """
+    ancestors = {}
+    if not employee_ids:
+        return ancestors
+    rows = db.session.execute(
+        select(OrgClosure.descendant_id, OrgClosure.ancestor_id, OrgClosure.depth)
+        .where(OrgClosure.descendant_id.in_(set(employee_ids)))
+    ).all()
+    for descendant_id, ancestor_id, depth in rows:
+        ancestors.setdefault(descendant_id, []).append((ancestor_id, depth))
+    return ancestors
+
+def add_to_hierarchy(employees):
+    """
+    Adds closure rows for newly created employees (objects or dicts with id and
+    manager_id), who have no reports yet. Managers may be earlier items of the
+    same list. Runs in the caller's transaction.
+    """
+    employees = [
+        (employee['id'], employee.get('manager_id')) if isinstance(employee, dict)
+        else (employee.id, employee.manager_id)
+        for employee in employees
+    ]
+    if not employees:
+        return
+
+    new_ids = {employee_id for employee_id, _ in employees}
+    known = ancestors_of({manager_id for _, manager_id in employees if manager_id and manager_id not in new_ids})
+
+    rows = []
+    for employee_id, manager_id in employees:
+        chain = [(employee_id, 0)]
+        chain += [(ancestor_id, depth + 1) for ancestor_id, depth in known.get(manager_id, [])]
+        known[employee_id] = chain
+        rows += [
+            {'ancestor_id': ancestor_id, 'descendant_id': employee_id, 'depth': depth}
+            for ancestor_id, depth in chain
+        ]
+    _insert_closure_rows(rows)
+
+def set_manager(employee_id, manager_id):
+    """
+    Moves an employee, with everyone reporting to them, under a new manager (or
+    to the top when manager_id is None). Raises ValueError if the new manager
+    reports to the employee. Runs in the caller's transaction.
+    """
+    subtree = db.session.execute(
+        select(OrgClosure.descendant_id, OrgClosure.depth).where(OrgClosure.ancestor_id == employee_id)
+    ).all()
+    if not subtree:
+        # Not in the hierarchy yet
+        subtree = [(employee_id, 0)]
+        _insert_closure_rows([{'ancestor_id': employee_id, 'descendant_id': employee_id, 'depth': 0}])
+
+    subtree_ids = [descendant_id for descendant_id, _ in subtree]
+    if manager_id in subtree_ids:
+        raise ValueError('An employee cannot report to themselves or to one of their reports')
+
+    # Detach the subtree from its old ancestors
+    db.session.execute(
+        delete(OrgClosure)
+        .where(
+            OrgClosure.descendant_id.in_(subtree_ids),
+            OrgClosure.ancestor_id.notin_(subtree_ids)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # Attach it below every ancestor of the new manager
+    if manager_id:
+        manager_chain = ancestors_of([manager_id]).get(manager_id, [(manager_id, 0)])
+        _insert_closure_rows([
+            {'ancestor_id': ancestor_id, 'descendant_id': descendant_id, 'depth': ancestor_depth + depth + 1}
+            for ancestor_id, ancestor_depth in manager_chain
+            for descendant_id, depth in subtree
+        ])
+
+def remove_from_hierarchy(employee_ids):
+    """
+    Deletes the closure rows of employees about to be deleted. Their direct
+    reports move to the top of the hierarchy together with their subtrees,
+    matching the manager_id the ORM clears on delete.
+    """
+    if not employee_ids:
+        return
+    report_ids = db.session.execute(
+        select(Employee.id).where(
+            Employee.manager_id.in_(employee_ids),
+            Employee.id.notin_(employee_ids)
+        )
+    ).scalars().all()
+    for report_id in report_ids:
+        set_manager(report_id, None)
+
+    db.session.execute(
+        delete(OrgClosure)
+        .where(OrgClosure.descendant_id.in_(employee_ids) | OrgClosure.ancestor_id.in_(employee_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+def reports_subquery(manager_id, max_depth=None):
+    """
+    Subquery of (id, depth) for everyone reporting to a manager, directly
+    (depth 1) or through other managers down to max_depth levels, read from
+    the closure table
+    """
+    conditions = [OrgClosure.ancestor_id == manager_id, OrgClosure.depth >= 1]
+    if max_depth is not None:
+        conditions.append(OrgClosure.depth <= max_depth)
+    return select(
+        OrgClosure.descendant_id.label('id'), OrgClosure.depth.label('depth')
+    ).where(*conditions).subquery('reports')
+
+def rebuild_org_closure():
+    """
+    Rebuilds the closure table from Employee.manager_id. Used to backfill
+    existing databases and as a maintenance operation. Employees caught in a
+    manager_id cycle are attached as far as the cycle allows.
+    """
+    managers = dict(db.session.execute(select(Employee.id, Employee.manager_id)).all())
+
+    rows = []
+    for employee_id in managers:
+        depth = 0
+        current = employee_id
+        seen = set()
+        while current and current not in seen and depth <= MAX_HIERARCHY_DEPTH:
+            seen.add(current)
+            rows.append({'ancestor_id': current, 'descendant_id': employee_id, 'depth': depth})
+            current = managers.get(current)
+            depth += 1
+
+    db.session.execute(delete(OrgClosure))
+    _insert_closure_rows(rows)
+    db.session.commit()
+    return len(managers)
@@ -0,0 +1,90 @@
+import base64
+import datetime
+import json
+from sqlalchemy import and_, or_, tuple_
+from models import db
+
+# Largest page the list endpoints return
+MAX_PAGE_SIZE = 100
+
+def clamp_page_size(page_size):
+    """
+    Limits a requested page size to 1..MAX_PAGE_SIZE, so a zero or negative
+    pageSize can't become an invalid LIMIT and a huge one can't dump the table
+    """
+    return min(max(page_size, 1), MAX_PAGE_SIZE)
+
+def encode_cursor(value, last_id):
+    """
+    Encodes the sort value and id of the last row of a page into an opaque cursor
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    payload = json.dumps({'v': value, 'id': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor, column):
+    """
+    Decodes a cursor produced by encode_cursor back into (value, id).
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        value, last_id = payload['v'], payload['id']
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    # Dates travel as ISO strings, convert them back so the comparison uses the column type
+    if value is not None and isinstance(column.type, db.Date):
+        value = datetime.date.fromisoformat(value)
+
+    return value, last_id
+
+def keyset_paginate(query, column, id_column, descending, page_size, cursor):
+    """
+    Returns (rows, next_cursor) for the page following `cursor`, ordered by
+    `column` with `id_column` as a tiebreaker.
+
+    Instead of OFFSET this seeks directly to the last seen (value, id), so every
+    page costs the same as the first one. NULLs are handled the way MySQL sorts
+    them: first in ascending order and last in descending order.
+    """
+    page_size = clamp_page_size(page_size)
+
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, column)
+
+        if descending:
+            if last_value is None:
+                condition = and_(column.is_(None), id_column < last_id)
+            else:
+                condition = or_(
+                    tuple_(column, id_column) < tuple_(last_value, last_id),
+                    column.is_(None)
+                )
+        else:
+            if last_value is None:
+                condition = or_(
+                    and_(column.is_(None), id_column > last_id),
+                    column.isnot(None)
+                )
+            else:
+                condition = tuple_(column, id_column) > tuple_(last_value, last_id)
+
+        query = query.filter(condition)
+
+    if descending:
+        query = query.order_by(column.desc(), id_column.desc())
+    else:
+        query = query.order_by(column.asc(), id_column.asc())
+
+    # Fetch one extra row to know whether there is a next page without a COUNT
+    rows = query.limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last_row = rows[-1]
+        next_cursor = encode_cursor(getattr(last_row, column.key), getattr(last_row, id_column.key))
+
+    return rows, next_cursor
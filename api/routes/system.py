@@ -0,0 +1,21 @@
+from flask import Blueprint, jsonify
+from models import ScheduledJob
+
+system_bp = Blueprint('system', __name__)
+
+@system_bp.route('/jobs', methods=['GET'])
+def get_scheduled_jobs():
+    # Last run time and duration of the background maintenance jobs
+    jobs = ScheduledJob.query.order_by(ScheduledJob.name).all()
+    
+    result = [{
+        'name': job.name,
+        'lastRunAt': job.last_run_at.isoformat() if job.last_run_at else None,
+        'lastDurationSeconds': job.last_duration,
+        'lastError': job.last_error,
+        'running': job.locked_by is not None,
+        'lockedBy': job.locked_by,
+        'lockedUntil': job.locked_until.isoformat() if job.locked_until else None
+    } for job in jobs]
+    
+    return jsonify({'data': result})
@@ -2,8 +2,15 @@
 from flask import Blueprint, request, jsonify
 import uuid
 import datetime
+from sqlalchemy import insert, update, select, literal, or_
+from sqlalchemy.exc import IntegrityError
 from models import db, Employee, TimeClock
 from schemas import TimeClockSchema
+from .absence.absence_utils import refresh_employee_statuses, status_update_statement, parse_date_range
+from .time_clock_utils import (
+    sync_clock_timestamps, sync_active_lock, day_bounds, parse_summary_groups, time_clock_summary
+)
+from .time_clock_sync import sync_punch_events, SYNC_MAX_EVENTS
 
 time_clock_bp = Blueprint('time_clock', __name__)
 time_clock_schema = TimeClockSchema()
@@ -29,14 +36,20 @@ def get_time_clock_entries():
     if status:
         query = query.filter(TimeClock.status == status)
     
-    if start_date:
-        query = query.filter(TimeClock.date >= start_date)
-    
-    if end_date:
-        query = query.filter(TimeClock.date <= end_date)
+    # Date filters are datetime ranges on clock_in_at, served by (employee_id, clock_in_at)
+    try:
+        if start_date:
+            start, _ = day_bounds(datetime.datetime.strptime(start_date, '%Y-%m-%d').date())
+            query = query.filter(TimeClock.clock_in_at >= start)
+        
+        if end_date:
+            _, end = day_bounds(datetime.datetime.strptime(end_date, '%Y-%m-%d').date())
+            query = query.filter(TimeClock.clock_in_at < end)
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
     
-    # Order by date and clock-in time, latest first
-    query = query.order_by(TimeClock.date.desc(), TimeClock.clock_in_time.desc())
+    # Latest clock-in first
+    query = query.order_by(TimeClock.clock_in_at.desc(), TimeClock.id)
     
     # Get total count before pagination
     total_count = query.count()
@@ -54,6 +67,32 @@ def get_time_clock_entries():
     
     return jsonify(result)
 
+@time_clock_bp.route('/summary', methods=['GET'])
+def get_time_clock_summary():
+    # Hours per employee, department, week and/or month, aggregated in SQL.
+    # Rows are arrays in the order of `columns` to keep large responses small.
+    try:
+        groups = parse_summary_groups(request.args.get('groupBy', ''))
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    columns, rows = time_clock_summary(
+        groups,
+        start,
+        end,
+        department=request.args.get('department', ''),
+        employee_id=request.args.get('employeeId', '')
+    )
+    
+    return jsonify({'data': {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'groupBy': groups,
+        'columns': columns,
+        'rows': rows
+    }})
+
 @time_clock_bp.route('/active/<employee_id>', methods=['GET'])
 def get_active_entry(employee_id):
     # Find active time clock entry for the employee
@@ -108,18 +147,110 @@ def clock_in():
         clock_in_time=current_time,
         status='active'
     )
+    sync_clock_timestamps(new_entry)
+    sync_active_lock(new_entry)
     
-    # Update employee status based on their preferred working mode
-    if employee.status == 'remote' or json_data.get('isRemote'):
+    # Remember a remote clock-in, the status refresh keeps remote employees remote
+    if json_data.get('isRemote'):
         employee.status = 'remote'
-    else:
-        employee.status = 'active'
     
     db.session.add(new_entry)
     
     try:
+        refresh_employee_statuses([employee_id])
         db.session.commit()
         return jsonify({'data': time_clock_schema.dump(new_entry)}), 201
+    except IntegrityError:
+        # A concurrent clock-in won the employee's active entry slot
+        db.session.rollback()
+        return jsonify({'error': 'Employee is already clocked in'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@time_clock_bp.route('/kiosk/clock-in', methods=['POST'])
+def kiosk_clock_in():
+    # Clock-in for shift-start bursts: no reads up front, the unique active
+    # entry slot rejects double clock-ins. Two statements (three for a remote
+    # clock-in) and a commit.
+    json_data = request.get_json() or {}
+    employee_id = json_data.get('employeeId')
+    
+    if not employee_id:
+        return jsonify({'error': 'Employee ID is required'}), 400
+    
+    now = datetime.datetime.now().replace(microsecond=0)
+    entry = {
+        'id': str(uuid.uuid4()),
+        'employee_id': employee_id,
+        'date': now.strftime('%Y-%m-%d'),
+        'clock_in_time': now.strftime('%H:%M:%S'),
+        'clock_out_time': None,
+        'total_hours': None,
+        'status': 'active'
+    }
+    
+    # INSERT ... SELECT only inserts for an existing employee who is not on leave
+    values = {
+        'id': literal(entry['id']),
+        'employee_id': Employee.id,
+        'date': literal(entry['date']),
+        'clock_in_time': literal(entry['clock_in_time']),
+        'status': literal('active'),
+        'clock_in_at': literal(now, TimeClock.clock_in_at.type),
+        'active_employee_id': Employee.id
+    }
+    clock_in_statement = insert(TimeClock).from_select(
+        list(values),
+        select(*values.values()).where(
+            Employee.id == employee_id,
+            or_(Employee.status.is_(None), Employee.status != 'on-leave')
+        )
+    )
+    
+    try:
+        inserted = db.session.execute(clock_in_statement).rowcount
+        if not inserted:
+            db.session.rollback()
+            # Error path only: find out why nothing was inserted
+            if not db.session.query(Employee.id).filter(Employee.id == employee_id).first():
+                return jsonify({'error': 'Employee not found'}), 404
+            return jsonify({'error': 'Cannot clock in while on leave'}), 400
+        
+        if json_data.get('isRemote'):
+            # Remember a remote clock-in, the status refresh keeps remote employees remote
+            db.session.execute(update(Employee).where(
+                Employee.id == employee_id,
+                or_(Employee.status.is_(None), Employee.status != 'inactive')
+            ).values(status='remote').execution_options(synchronize_session=False))
+        # Same status rules as refresh_employee_statuses, in one UPDATE
+        db.session.execute(status_update_statement(now.date(), [employee_id]))
+        db.session.commit()
+        return jsonify({'data': time_clock_schema.dump(entry)}), 201
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Employee is already clocked in'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@time_clock_bp.route('/sync', methods=['POST'])
+def sync_time_clock_events():
+    # Batch of timestamped punches queued by an offline kiosk, applied in one transaction
+    json_data = request.get_json()
+    events = json_data.get('events') if isinstance(json_data, dict) else None
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'A non-empty list of events is required'}), 400
+    
+    if len(events) > SYNC_MAX_EVENTS:
+        return jsonify({'error': f'A sync cannot contain more than {SYNC_MAX_EVENTS} events'}), 400
+    
+    try:
+        return jsonify({'data': sync_punch_events(events)})
+    except IntegrityError:
+        # Another sync recorded some of these events or entries first, resending is safe
+        db.session.rollback()
+        return jsonify({'error': 'Conflicting concurrent sync, retry the batch'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -146,27 +277,15 @@ def clock_out():
     now = datetime.datetime.now()
     current_time = now.strftime('%H:%M:%S')
     
-    # Calculate hours worked
-    clock_in = datetime.datetime.strptime(active_entry.date + ' ' + active_entry.clock_in_time, '%Y-%m-%d %H:%M:%S')
-    clock_out = datetime.datetime.strptime(active_entry.date + ' ' + current_time, '%Y-%m-%d %H:%M:%S')
-    
-    # Handle overnight shifts
-    if clock_out < clock_in:
-        clock_out = clock_out + datetime.timedelta(days=1)
-    
-    hours_worked = (clock_out - clock_in).total_seconds() / 3600
-    
-    # Update the entry
+    # Update the entry, overnight shifts end the day after their date
     active_entry.clock_out_time = current_time
-    active_entry.total_hours = round(hours_worked, 2)
+    active_entry.total_hours = sync_clock_timestamps(active_entry)
     active_entry.status = 'completed'
-    
-    # Update employee status to out-of-office when clocked out
-    employee = Employee.query.get(employee_id)
-    if employee and employee.status not in ['on-leave', 'inactive']:
-        employee.status = 'out-of-office'
+    sync_active_lock(active_entry)
     
     try:
+        # Clocked out for the day: out-of-office unless on leave or inactive
+        refresh_employee_statuses([employee_id])
         db.session.commit()
         return jsonify({'data': time_clock_schema.dump(active_entry)})
     except Exception as e:
@@ -199,24 +318,18 @@ def update_time_clock_entry(id):
     if 'status' in json_data:
         entry.status = json_data['status']
         
+    # Keep the timestamp columns in step, the strings must stay parseable
+    try:
+        hours_worked = sync_clock_timestamps(entry)
+    except (TypeError, ValueError):
+        db.session.rollback()
+        return jsonify({'error': 'Date must use YYYY-MM-DD and times HH:MM:SS'}), 400
+    
+    sync_active_lock(entry)
+    
     # Calculate total hours if both clock in and out times are present
-    if entry.clock_in_time and entry.clock_out_time:
-        try:
-            # Parse times
-            clock_in = datetime.datetime.strptime(entry.date + ' ' + entry.clock_in_time, '%Y-%m-%d %H:%M:%S')
-            clock_out = datetime.datetime.strptime(entry.date + ' ' + entry.clock_out_time, '%Y-%m-%d %H:%M:%S')
-            
-            # Handle overnight shifts
-            if clock_out < clock_in:
-                clock_out = clock_out + datetime.timedelta(days=1)
-            
-            # Calculate hours
-            hours_worked = (clock_out - clock_in).total_seconds() / 3600
-            entry.total_hours = round(hours_worked, 2)
-        except Exception as e:
-            # If there's an error in calculation, use the provided value or keep existing
-            if 'totalHours' in json_data:
-                entry.total_hours = json_data['totalHours']
+    if hours_worked is not None:
+        entry.total_hours = hours_worked
     elif 'totalHours' in json_data:
         # If we can't calculate, use the provided value
         entry.total_hours = json_data['totalHours']
@@ -224,6 +337,9 @@ def update_time_clock_entry(id):
     try:
         db.session.commit()
         return jsonify({'data': time_clock_schema.dump(entry)})
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Employee already has an active time clock entry'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,209 @@
+import datetime
+import uuid
+from sqlalchemy import select, insert, update
+from models import db, Employee, TimeClock, TimeClockEvent
+from .absence.absence_utils import refresh_employee_statuses
+from .time_clock_utils import clock_timestamps
+
+# Largest batch a kiosk can send in one sync
+SYNC_MAX_EVENTS = 5000
+
+# Kiosk clocks may run slightly ahead of the server
+SYNC_CLOCK_SKEW = datetime.timedelta(minutes=5)
+
+def parse_punch_event(index, event):
+    """
+    Returns (event, error) for one raw punch, with the timestamp converted to a
+    naive local datetime like the rest of the time clock columns
+    """
+    if not isinstance(event, dict):
+        return None, 'Each event must be an object'
+
+    event_id = event.get('eventId')
+    employee_id = event.get('employeeId')
+    punch_type = event.get('type')
+    if not isinstance(event_id, str) or not event_id or len(event_id) > 64:
+        return None, 'eventId is required (at most 64 characters)'
+    if not employee_id:
+        return None, 'employeeId is required'
+    if punch_type not in ['in', 'out']:
+        return None, "type must be 'in' or 'out'"
+
+    try:
+        occurred_at = datetime.datetime.fromisoformat(event.get('timestamp') or '')
+    except (TypeError, ValueError):
+        return None, 'timestamp must be an ISO 8601 date and time'
+    if occurred_at.tzinfo is not None:
+        occurred_at = occurred_at.astimezone().replace(tzinfo=None)
+    if occurred_at > datetime.datetime.now() + SYNC_CLOCK_SKEW:
+        return None, 'timestamp is in the future'
+
+    return {
+        'index': index,
+        'id': event_id,
+        'employee_id': employee_id,
+        'type': punch_type,
+        'occurred_at': occurred_at.replace(microsecond=0)
+    }, None
+
+def close_entry(entry, clock_out_at):
+    entry['clock_out_time'] = clock_out_at.strftime('%H:%M:%S')
+    entry['clock_out_at'] = clock_out_at
+    entry['total_hours'] = round((clock_out_at - entry['clock_in_at']).total_seconds() / 3600, 2)
+    entry['status'] = 'completed'
+    entry['active_employee_id'] = None
+
+def pair_punch_events(events, open_entries):
+    """
+    Orders each employee's punches by time and pairs them into entries.
+
+    `open_entries` maps employee_id to their active entry (a dict of TimeClock
+    columns) from the database; its clock_in_at is None if the stored
+    clock-in time can't be read. Returns (new_entries, closed_entries,
+    event_entries, rejected): entries to insert, existing entries to close,
+    event id -> entry id, and {event id: error} for punches that do not pair.
+    """
+    new_entries = []
+    closed_entries = []
+    event_entries = {}
+    rejected = {}
+
+    by_employee = {}
+    for event in events:
+        by_employee.setdefault(event['employee_id'], []).append(event)
+
+    for employee_id, employee_events in by_employee.items():
+        open_entry = open_entries.get(employee_id)
+        open_entry_is_new = False
+        # At the same instant a clock-out closes the previous entry before a clock-in opens the next
+        for event in sorted(employee_events, key=lambda event: (event['occurred_at'], event['type'] == 'in')):
+            occurred_at = event['occurred_at']
+            if event['type'] == 'in':
+                if open_entry:
+                    rejected[event['id']] = 'Employee is already clocked in'
+                    continue
+                open_entry = {
+                    'id': str(uuid.uuid4()),
+                    'employee_id': employee_id,
+                    'date': occurred_at.strftime('%Y-%m-%d'),
+                    'clock_in_time': occurred_at.strftime('%H:%M:%S'),
+                    'clock_out_time': None,
+                    'total_hours': None,
+                    'status': 'active',
+                    'clock_in_at': occurred_at,
+                    'clock_out_at': None,
+                    'active_employee_id': employee_id
+                }
+                open_entry_is_new = True
+                new_entries.append(open_entry)
+            else:
+                if not open_entry:
+                    rejected[event['id']] = 'No active time clock entry found'
+                    continue
+                if open_entry['clock_in_at'] is None:
+                    rejected[event['id']] = 'Active time clock entry has an invalid clock-in time'
+                    continue
+                if occurred_at < open_entry['clock_in_at']:
+                    rejected[event['id']] = 'Clock-out is earlier than the clock-in'
+                    continue
+                close_entry(open_entry, occurred_at)
+                if not open_entry_is_new:
+                    closed_entries.append(open_entry)
+            event_entries[event['id']] = open_entry['id']
+            if event['type'] == 'out':
+                open_entry = None
+                open_entry_is_new = False
+
+    return new_entries, closed_entries, event_entries, rejected
+
+def sync_punch_events(raw_events):
+    """
+    Records a batch of offline punches in one transaction and returns a
+    per-batch report. Events already received (same eventId) are skipped, so a
+    kiosk can safely resend a batch whose response it never got. An eventId
+    repeated within the batch is rejected after its first occurrence.
+    """
+    rejected = []
+    events = {}
+    for index, raw_event in enumerate(raw_events):
+        event, error = parse_punch_event(index, raw_event)
+        if error:
+            rejected.append({'index': index, 'eventId': raw_event.get('eventId') if isinstance(raw_event, dict) else None, 'error': error})
+        elif event['id'] in events:
+            rejected.append({'index': index, 'eventId': event['id'], 'error': 'Duplicate eventId in batch'})
+        else:
+            events[event['id']] = event
+
+    # One lookup each for replayed events, unknown employees and open entries
+    duplicates = set(db.session.execute(
+        select(TimeClockEvent.id).where(TimeClockEvent.id.in_(list(events)))
+    ).scalars()) if events else set()
+    events = [event for event in events.values() if event['id'] not in duplicates]
+
+    employee_ids = {event['employee_id'] for event in events}
+    existing_employees = set(db.session.execute(
+        select(Employee.id).where(Employee.id.in_(employee_ids))
+    ).scalars()) if employee_ids else set()
+
+    accepted_events = []
+    for event in events:
+        if event['employee_id'] in existing_employees:
+            accepted_events.append(event)
+        else:
+            rejected.append({'index': event['index'], 'eventId': event['id'], 'error': 'Employee not found'})
+
+    open_entries = {}
+    if existing_employees:
+        columns = [TimeClock.id, TimeClock.employee_id, TimeClock.clock_in_at, TimeClock.date, TimeClock.clock_in_time]
+        for entry_id, employee_id, clock_in_at, date, clock_in_time in db.session.execute(
+            select(*columns).where(TimeClock.active_employee_id.in_(existing_employees))
+        ):
+            if clock_in_at is None:
+                # Entries from before the timestamp columns only have the strings
+                try:
+                    clock_in_at, _ = clock_timestamps(date, clock_in_time)
+                except (TypeError, ValueError):
+                    clock_in_at = None
+            open_entries[employee_id] = {'id': entry_id, 'employee_id': employee_id, 'clock_in_at': clock_in_at}
+
+    new_entries, closed_entries, event_entries, pairing_errors = pair_punch_events(accepted_events, open_entries)
+    for event in accepted_events:
+        if event['id'] in pairing_errors:
+            rejected.append({'index': event['index'], 'eventId': event['id'], 'error': pairing_errors[event['id']]})
+
+    recorded = [event for event in accepted_events if event['id'] in event_entries]
+    now = datetime.datetime.utcnow()
+
+    # Closed entries go first so an employee's active slot is free before a new entry claims it
+    if closed_entries:
+        db.session.execute(update(TimeClock), [{
+            'id': entry['id'],
+            'clock_in_at': entry['clock_in_at'],
+            'clock_out_time': entry['clock_out_time'],
+            'clock_out_at': entry['clock_out_at'],
+            'total_hours': entry['total_hours'],
+            'status': 'completed',
+            'active_employee_id': None
+        } for entry in closed_entries])
+    if new_entries:
+        db.session.execute(insert(TimeClock), new_entries)
+    if recorded:
+        db.session.execute(insert(TimeClockEvent), [{
+            'id': event['id'],
+            'employee_id': event['employee_id'],
+            'type': event['type'],
+            'occurred_at': event['occurred_at'],
+            'time_clock_id': event_entries[event['id']],
+            'received_at': now
+        } for event in recorded])
+
+    refresh_employee_statuses({event['employee_id'] for event in recorded})
+    db.session.commit()
+
+    return {
+        'accepted': len(recorded),
+        'duplicates': sorted(duplicates),
+        'rejected': sorted(rejected, key=lambda error: error['index']),
+        'entriesCreated': len(new_entries),
+        'entriesClosed': len(closed_entries)
+    }
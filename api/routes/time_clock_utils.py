@@ -0,0 +1,170 @@
+import datetime
+from sqlalchemy import select, update, func
+from models import db, Employee, TimeClock
+
+def clock_timestamps(date, clock_in_time, clock_out_time=None):
+    """
+    Converts the string date and times of an entry into (clock_in_at,
+    clock_out_at) datetimes. A clock-out earlier than the clock-in is an
+    overnight shift ending the next day. Raises ValueError on bad formats.
+    """
+    clock_in_at = datetime.datetime.strptime(f'{date} {clock_in_time}', '%Y-%m-%d %H:%M:%S')
+    clock_out_at = None
+    if clock_out_time:
+        clock_out_at = datetime.datetime.strptime(f'{date} {clock_out_time}', '%Y-%m-%d %H:%M:%S')
+        if clock_out_at < clock_in_at:
+            clock_out_at += datetime.timedelta(days=1)
+    return clock_in_at, clock_out_at
+
+def sync_clock_timestamps(entry):
+    """
+    Sets clock_in_at and clock_out_at from the string columns of an entry and
+    returns the hours worked, or None while it is still open
+    """
+    entry.clock_in_at, entry.clock_out_at = clock_timestamps(entry.date, entry.clock_in_time, entry.clock_out_time)
+    if entry.clock_out_at is None:
+        return None
+    return round((entry.clock_out_at - entry.clock_in_at).total_seconds() / 3600, 2)
+
+def sync_active_lock(entry):
+    """
+    Claims or releases the employee's single active entry slot to match the
+    entry status. Flushing a second active entry raises IntegrityError.
+    """
+    entry.active_employee_id = entry.employee_id if entry.status == 'active' else None
+
+def day_bounds(date):
+    """
+    Returns the [start, end) datetimes of a day, for range filters on clock_in_at
+    """
+    start = datetime.datetime.combine(date, datetime.time.min)
+    return start, start + datetime.timedelta(days=1)
+
+def week_start_expression(column, dialect_name):
+    """
+    SQL expression for the Monday of the week of a datetime column, as a date
+    """
+    if dialect_name == 'sqlite':
+        # Forward to the week's Sunday, then back to its Monday
+        return func.date(column, 'weekday 0', '-6 days')
+    # MySQL: WEEKDAY() is 0 on Monday
+    return func.date(func.subdate(column, func.weekday(column)))
+
+def month_expression(column, dialect_name):
+    """
+    SQL expression for the YYYY-MM month of a datetime column
+    """
+    if dialect_name == 'sqlite':
+        return func.strftime('%Y-%m', column)
+    return func.date_format(column, '%Y-%m')
+
+# groupBy option -> output columns
+SUMMARY_GROUPS = {
+    'employee': ['employeeId', 'employeeName'],
+    'department': ['department'],
+    'week': ['week'],
+    'month': ['month']
+}
+
+def parse_summary_groups(value):
+    """
+    Parses a comma separated groupBy argument. Raises ValueError when it is
+    empty or names an unknown grouping.
+    """
+    groups = list(dict.fromkeys(group.strip() for group in value.split(',') if group.strip()))
+    if not groups:
+        raise ValueError(f'groupBy is required, among {", ".join(SUMMARY_GROUPS)}')
+    unknown = [group for group in groups if group not in SUMMARY_GROUPS]
+    if unknown:
+        raise ValueError(f'Invalid groupBy: {", ".join(unknown)}. Must be among {", ".join(SUMMARY_GROUPS)}')
+    return groups
+
+def time_clock_summary(groups, start, end, department=None, employee_id=None):
+    """
+    Hours and entries per group for entries clocked in between start and end
+    (dates, inclusive), aggregated in the database with one GROUP BY query.
+    Returns (columns, rows).
+    """
+    dialect_name = db.session.get_bind().dialect.name
+    range_start, _ = day_bounds(start)
+    _, range_end = day_bounds(end)
+
+    group_columns = []
+    for group in groups:
+        if group == 'employee':
+            group_columns += [TimeClock.employee_id, Employee.name]
+        elif group == 'department':
+            group_columns.append(Employee.department)
+        elif group == 'week':
+            group_columns.append(week_start_expression(TimeClock.clock_in_at, dialect_name))
+        elif group == 'month':
+            group_columns.append(month_expression(TimeClock.clock_in_at, dialect_name))
+
+    # Grouping by the labels keeps MySQL's ONLY_FULL_GROUP_BY happy with expressions
+    labels = [f'group_{index}' for index in range(len(group_columns))]
+    group_columns = [column.label(label) for column, label in zip(group_columns, labels)]
+
+    query = db.session.query(
+        *group_columns,
+        func.coalesce(func.sum(TimeClock.total_hours), 0),
+        func.count(TimeClock.id),
+        func.count(func.distinct(TimeClock.employee_id))
+    ).filter(
+        TimeClock.clock_in_at >= range_start,
+        TimeClock.clock_in_at < range_end
+    )
+    if {'employee', 'department'} & set(groups) or department:
+        query = query.join(Employee, TimeClock.employee_id == Employee.id)
+    if department:
+        query = query.filter(Employee.department == department)
+    if employee_id:
+        query = query.filter(TimeClock.employee_id == employee_id)
+
+    rows = query.group_by(*labels).order_by(*labels).all()
+
+    columns = [column for group in groups for column in SUMMARY_GROUPS[group]]
+    columns += ['hours', 'entries', 'employees']
+    width = len(group_columns)
+    return columns, [
+        [str(value) if value is not None and not isinstance(value, str) else value for value in row[:width]]
+        + [round(row[width], 2), row[width + 1], row[width + 2]]
+        for row in rows
+    ]
+
+def backfill_clock_timestamps(batch_size=1000):
+    """
+    Fills clock_in_at and clock_out_at for entries written before those columns
+    existed, committing one batch at a time. Rows whose strings cannot be parsed
+    are skipped and counted. Returns (converted, skipped).
+    """
+    converted = 0
+    skipped = 0
+    last_id = ''
+    while True:
+        batch = db.session.execute(
+            select(TimeClock.id, TimeClock.date, TimeClock.clock_in_time, TimeClock.clock_out_time)
+            .where(TimeClock.clock_in_at.is_(None), TimeClock.id > last_id)
+            .order_by(TimeClock.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+
+        rows = []
+        for entry_id, date, clock_in_time, clock_out_time in batch:
+            try:
+                clock_in_at, clock_out_at = clock_timestamps(date, clock_in_time, clock_out_time)
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            rows.append({'id': entry_id, 'clock_in_at': clock_in_at, 'clock_out_at': clock_out_at})
+
+        if rows:
+            # ORM bulk UPDATE by primary key, one executemany per batch
+            db.session.execute(update(TimeClock), rows)
+        db.session.commit()
+
+        converted += len(rows)
+        last_id = batch[-1][0]
+
+    return converted, skipped
@@ -0,0 +1,188 @@
+import datetime
+import functools
+import os
+import socket
+import threading
+import time
+import uuid
+import click
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+from models import db, ScheduledJob
+
+class Job:
+    def __init__(self, name, func, interval=None, at_midnight=False, lease=600):
+        self.name = name
+        self.func = func
+        self.interval = interval  # Seconds between runs, None to disable
+        self.at_midnight = at_midnight
+        self.lease = lease  # Seconds before a lock held by a dead worker expires
+
+    def last_slot(self, now):
+        """
+        Returns the most recent time this job was due at or before `now`
+        """
+        slots = []
+        if self.at_midnight:
+            slots.append(datetime.datetime.combine(now.date(), datetime.time.min))
+        if self.interval:
+            epoch = now.timestamp()
+            slots.append(datetime.datetime.fromtimestamp(epoch - epoch % self.interval))
+        return max(slots) if slots else None
+
+class Scheduler:
+    """
+    In-process scheduler for maintenance jobs.
+
+    Every worker runs one, but a job only executes in the worker that wins its
+    lock row in scheduled_jobs, and only if no worker has run it since the
+    slot became due. With N gunicorn workers each slot still runs once.
+    """
+
+    def __init__(self, app, tick=30):
+        self.app = app
+        self.tick = tick
+        self.jobs = []
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, func, interval=None, at_midnight=False, lease=600):
+        self.jobs.append(Job(name, func, interval=interval, at_midnight=at_midnight, lease=lease))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            for job in self.jobs:
+                with self.app.app_context():
+                    try:
+                        self.run_if_due(job)
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Scheduler error for job {job.name}: {str(e)}")
+            self._stop.wait(self.tick)
+
+    def _ensure_row(self, name):
+        if db.session.get(ScheduledJob, name) is None:
+            try:
+                db.session.add(ScheduledJob(name=name))
+                db.session.commit()
+            except IntegrityError:
+                # Another worker created it first
+                db.session.rollback()
+
+    def _acquire(self, job, now):
+        acquired = db.session.execute(
+            update(ScheduledJob)
+            .where(
+                ScheduledJob.name == job.name,
+                or_(ScheduledJob.locked_until.is_(None), ScheduledJob.locked_until < now)
+            )
+            .values(locked_by=self.owner, locked_until=now + datetime.timedelta(seconds=job.lease))
+        ).rowcount == 1
+        db.session.commit()
+        return acquired
+
+    def run_if_due(self, job, now=None):
+        """
+        Runs the job if its latest slot has not been run by any worker yet.
+        Returns True if it ran.
+        """
+        now = now or datetime.datetime.now()
+        slot = job.last_slot(now)
+        if slot is None:
+            return False
+
+        self._ensure_row(job.name)
+        row = db.session.get(ScheduledJob, job.name)
+        if row.last_run_at and row.last_run_at >= slot:
+            return False
+
+        if not self._acquire(job, now):
+            return False
+
+        # Re-read under the lock, another worker may have just finished this slot
+        db.session.expire_all()
+        row = db.session.get(ScheduledJob, job.name)
+        if row.last_run_at and row.last_run_at >= slot:
+            self._release(job.name)
+            return False
+
+        started = time.perf_counter()
+        error = None
+        try:
+            job.func()
+        except Exception as e:
+            db.session.rollback()
+            error = str(e)
+            print(f"Scheduled job {job.name} failed: {error}")
+
+        row = db.session.get(ScheduledJob, job.name)
+        row.last_run_at = now
+        row.last_duration = round(time.perf_counter() - started, 3)
+        row.last_error = error
+        db.session.commit()
+        self._release(job.name)
+        return True
+
+    def _release(self, name):
+        db.session.execute(
+            update(ScheduledJob)
+            .where(ScheduledJob.name == name, ScheduledJob.locked_by == self.owner)
+            .values(locked_by=None, locked_until=None)
+        )
+        db.session.commit()
+
+def is_serving_process(app):
+    """
+    Whether this process serves requests and should run the scheduler.
+
+    `flask <command>` maintenance commands load the app too but exit when done,
+    and with the reloader on the parent process only watches files while the
+    child it spawns (WERKZEUG_RUN_MAIN=true) serves requests.
+    """
+    use_reloader = None
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None:
+        if ctx.info_name != 'run':
+            return False
+        use_reloader = ctx.params.get('reload')
+    if use_reloader is None:
+        use_reloader = app.debug
+    return not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+def init_scheduler(app):
+    """
+    Registers the maintenance jobs and starts the scheduler thread.
+
+    STATUS_ROLLOVER_INTERVAL (seconds, default 3600, 0 to disable) sets how
+    often the full employee status sweep runs in addition to midnight.
+    Expired idempotency records are evicted every IDEMPOTENCY_EVICTION_INTERVAL
+    seconds (default 3600).
+    """
+    from routes.absence.absence_utils import update_employee_statuses_based_on_absences
+    from idempotency import evict_expired_idempotency_records
+
+    scheduler = Scheduler(app, tick=int(os.getenv('SCHEDULER_TICK', '30')))
+    scheduler.add_job(
+        'status_rollover',
+        # Raise so a failed sweep is recorded in last_error
+        functools.partial(update_employee_statuses_based_on_absences, raise_errors=True),
+        interval=int(os.getenv('STATUS_ROLLOVER_INTERVAL', '3600')) or None,
+        at_midnight=True
+    )
+    scheduler.add_job(
+        'idempotency_eviction',
+        evict_expired_idempotency_records,
+        interval=int(os.getenv('IDEMPOTENCY_EVICTION_INTERVAL', '3600')) or None
+    )
+    scheduler.start()
+    app.extensions['scheduler'] = scheduler
+    return scheduler
@@ -0,0 +1,57 @@
+-- Schema changes for existing databases.
+-- db.create_all() only creates missing tables, so indexes and columns added to
+-- models.py after a table exists have to be applied by hand, in order.
+
+-- Sort/seek indexes for cursor pagination on GET /api/employees
+-- (InnoDB secondary indexes carry the primary key, so these cover (column, id))
+CREATE INDEX ix_employees_name ON employees (name);
+CREATE INDEX ix_employees_department ON employees (department);
+CREATE INDEX ix_employees_hire_date ON employees (hire_date);
+
+-- Employee search index: the employee_search_tokens table is created by
+-- db.create_all(); fill it for existing employees with `flask rebuild-search-index`
+
+-- Set-based employee status recompute
+CREATE INDEX ix_absences_employee_status_end ON absences (employee_id, status, end_date, start_date);
+CREATE INDEX ix_time_clock_employee_date ON time_clock (employee_id, date);
+
+-- Absence calendar: approved absences overlapping a date window
+CREATE INDEX ix_absences_status_dates ON absences (status, start_date, end_date);
+
+-- Leave ledger: leave_accrual_rules, leave_ledger and leave_balances are created
+-- by db.create_all(); fill them for existing absences with `flask rebuild-leave-ledger`
+
+-- Working days: the holidays table is created by db.create_all(). Leave is now
+-- posted in working days; run `flask rebuild-leave-ledger` to convert balances
+-- that were posted in calendar days
+
+-- Working-day cache invalidation across workers: the holiday_calendar_version
+-- table is created by db.create_all(), its row by the first holiday change
+
+-- Manager approval inbox: walk the reporting tree and find pending absences
+CREATE INDEX ix_employees_manager_id ON employees (manager_id);
+CREATE INDEX ix_absences_status_employee ON absences (status, employee_id, request_date);
+
+-- Org hierarchy: the org_closure table is created by db.create_all(); fill it
+-- for existing employees with `flask rebuild-org-closure`
+
+-- Team overview: latest review per employee
+CREATE INDEX ix_performance_reviews_employee_date ON performance_reviews (employee_id, review_date);
+
+-- Time clock timestamps: native DATETIME columns written alongside the string
+-- date/time columns. Fill existing rows with `flask backfill-time-clock`.
+ALTER TABLE time_clock ADD COLUMN clock_in_at DATETIME NULL, ADD COLUMN clock_out_at DATETIME NULL;
+CREATE INDEX ix_time_clock_employee_clock_in ON time_clock (employee_id, clock_in_at);
+
+-- One active time clock entry per employee, enforced by a unique index
+-- (close or delete duplicate active entries before running the UPDATE)
+ALTER TABLE time_clock ADD COLUMN active_employee_id VARCHAR(36) NULL;
+UPDATE time_clock SET active_employee_id = employee_id WHERE status = 'active';
+CREATE UNIQUE INDEX ix_time_clock_active_employee_id ON time_clock (active_employee_id);
+
+-- Offline kiosk sync: the time_clock_events table is created by db.create_all()
+
+-- Idempotency keys: the idempotency_records table is created by db.create_all()
+
+-- Timesheet summary: date range scans over all employees
+CREATE INDEX ix_time_clock_clock_in_hours ON time_clock (clock_in_at, employee_id, total_hours);